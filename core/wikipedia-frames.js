@@ -0,0 +1,109 @@
+const zlib = require("zlib");
+
+// Decoder for the binary framing written by `wikipedia_api.py --format binary`
+// (see local/wikipedia_frames.py). Each frame is a 6-byte header
+// (type, flags, big-endian payload length) followed by its payload:
+//
+//   J  JSON document; large strings are replaced by {"$body": <index>}
+//   B  raw UTF-8 body, referenced by index in order of appearance
+//   E  end of message
+//
+// Flag bit 0 marks a zlib-compressed payload.
+const HEADER_SIZE = 6;
+const FLAG_COMPRESSED = 0x01;
+
+class FrameDecoder {
+    constructor() {
+        this.chunks = [];
+        this.length = 0;
+        this.needed = HEADER_SIZE;
+        this.document = null;
+        this.bodies = [];
+    }
+
+    // Feed a chunk of the stream; returns the messages it completed. Chunks
+    // are only joined once a whole frame has arrived, so large bodies are
+    // copied once rather than on every chunk.
+    push(chunk) {
+        this.chunks.push(chunk);
+        this.length += chunk.length;
+        if (this.length < this.needed) {
+            return [];
+        }
+
+        const buffer = this.chunks.length === 1 ? this.chunks[0] : Buffer.concat(this.chunks, this.length);
+        const messages = [];
+        let offset = 0;
+
+        while (buffer.length - offset >= HEADER_SIZE) {
+            const payloadLength = buffer.readUInt32BE(offset + 2);
+            const end = offset + HEADER_SIZE + payloadLength;
+            if (buffer.length < end) {
+                break;
+            }
+
+            const type = String.fromCharCode(buffer[offset]);
+            const flags = buffer[offset + 1];
+            let payload = buffer.subarray(offset + HEADER_SIZE, end);
+            offset = end;
+
+            if (flags & FLAG_COMPRESSED) {
+                payload = zlib.inflateSync(payload);
+            }
+
+            if (type === "J") {
+                this.document = JSON.parse(payload.toString("utf8"));
+            } else if (type === "B") {
+                this.bodies.push(payload.toString("utf8"));
+            } else if (type === "E") {
+                messages.push(restoreBodies(this.document, this.bodies));
+                this.document = null;
+                this.bodies = [];
+            } else {
+                throw new Error(`Unknown frame type: ${type}`);
+            }
+        }
+
+        const rest = buffer.subarray(offset);
+        this.chunks = rest.length ? [rest] : [];
+        this.length = rest.length;
+        this.needed = rest.length >= HEADER_SIZE ? HEADER_SIZE + rest.readUInt32BE(2) : HEADER_SIZE;
+
+        return messages;
+    }
+
+    // True while a message has started but not yet ended
+    get pending() {
+        return this.length > 0 || this.document !== null || this.bodies.length > 0;
+    }
+}
+
+function restoreBodies(value, bodies) {
+    if (Array.isArray(value)) {
+        return value.map((item) => restoreBodies(item, bodies));
+    }
+    if (value && typeof value === "object") {
+        const keys = Object.keys(value);
+        if (keys.length === 1 && keys[0] === "$body") {
+            return bodies[value.$body];
+        }
+        const restored = {};
+        for (const key of keys) {
+            restored[key] = restoreBodies(value[key], bodies);
+        }
+        return restored;
+    }
+    return value;
+}
+
+// Decode a complete output buffer into its messages
+function decodeMessages(buffer) {
+    const decoder = new FrameDecoder();
+    const messages = decoder.push(buffer);
+    if (decoder.pending) {
+        throw new Error("Truncated Wikipedia bridge message");
+    }
+    return messages;
+}
+
+module.exports = { FrameDecoder, decodeMessages };
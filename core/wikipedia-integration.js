@@ -1,6 +1,12 @@
 const { spawn } = require("child_process");
 const fs = require("fs");
 const path = require("path");
+const { FrameDecoder, decodeMessages } = require("./wikipedia-frames");
+
+// After a daemon dies before answering anything, wait this long before
+// spawning another, doubling per consecutive failure up to the maximum
+const DAEMON_RETRY_MS = 1000;
+const DAEMON_RETRY_MAX_MS = 60000;
 
 class WikipediaIntegration {
     constructor(wikipediaDbPath = "./wikipedia.db") {
@@ -8,6 +14,16 @@ class WikipediaIntegration {
         this.searchEngine = null;
         this.contextExtractor = null;
         this.available = false;
+
+        // Long-running `wikipedia_api.py --serve` process shared by all calls.
+        // Both it and the per-call fallback answer in binary frames, so
+        // article bodies arrive as raw UTF-8 rather than JSON-escaped strings
+        this.daemon = null;
+        this.pendingRequests = new Map();
+        this.nextRequestId = 1;
+        this.daemonFailures = 0;
+        this.daemonRetryAt = 0;
+
         this.initializeWikipedia();
     }
 
@@ -29,14 +45,15 @@ class WikipediaIntegration {
         }
     }
 
-    async searchWikipedia(query, limit = 5) {
+    async searchWikipedia(query, limit = 5, cursor = null) {
         if (!this.available) {
             return { results: [], error: "Wikipedia not available" };
         }
 
         try {
-            const result = await this.runPythonScript("search", { query, limit });
-            return JSON.parse(result);
+            // Pass the previous response's next_cursor to fetch the next page
+            const params = cursor ? { query, limit, cursor } : { query, limit };
+            return await this.callWikipediaApi("search", params);
         } catch (error) {
             console.error("Wikipedia search failed:", error);
             return { results: [], error: error.message };
@@ -49,41 +66,223 @@ class WikipediaIntegration {
         }
 
         try {
-            const result = await this.runPythonScript("context", { query, maxLength });
-            return JSON.parse(result);
+            return await this.callWikipediaApi("context", { query, maxLength });
         } catch (error) {
             console.error("Wikipedia context extraction failed:", error);
             return { context: "", sources: [], confidence: 0 };
         }
     }
 
+    async suggestTitles(prefix, limit = 8) {
+        if (!this.available) {
+            return { suggestions: [], error: "Wikipedia not available" };
+        }
+
+        try {
+            return await this.callWikipediaApi("suggest", { prefix, limit });
+        } catch (error) {
+            console.error("Wikipedia title suggestions failed:", error);
+            return { suggestions: [], error: error.message };
+        }
+    }
+
+    async batchWikipedia(operations) {
+        if (!this.available) {
+            return { results: [], error: "Wikipedia not available" };
+        }
+
+        try {
+            return await this.callWikipediaApi("batch", { operations });
+        } catch (error) {
+            console.error("Wikipedia batch failed:", error);
+            return { results: [], error: error.message };
+        }
+    }
+
     async getWikipediaStats() {
         if (!this.available) {
             return { error: "Wikipedia not available" };
         }
 
         try {
-            const result = await this.runPythonScript("stats", {});
-            return JSON.parse(result);
+            return await this.callWikipediaApi("stats", {});
         } catch (error) {
             console.error("Wikipedia stats failed:", error);
             return { error: error.message };
         }
     }
 
+    async callWikipediaApi(action, params) {
+        try {
+            return await this.sendDaemonRequest(action, params);
+        } catch (error) {
+            if (error.code !== "DAEMON_UNAVAILABLE") {
+                throw error;
+            }
+            // Fall back to one process per call
+            return await this.runPythonScript(action, params);
+        }
+    }
+
+    startDaemon() {
+        const daemon = spawn("python3", [
+            path.join(__dirname, "wikipedia_api.py"),
+            "--format",
+            "binary",
+            "--serve",
+            this.wikipediaDbPath,
+        ]);
+        const decoder = new FrameDecoder();
+        let errorOutput = "";
+        let answered = false;
+
+        daemon.stdout.on("data", (data) => {
+            let responses;
+            try {
+                responses = decoder.push(data);
+            } catch (error) {
+                onDaemonExit(`Invalid Wikipedia daemon response: ${error.message}`);
+                return;
+            }
+            for (const response of responses) {
+                // Only a reply to a request shows that the daemon started
+                if (response.id !== undefined && !answered) {
+                    answered = true;
+                    this.daemonFailures = 0;
+                }
+                this.handleDaemonResponse(response);
+            }
+        });
+
+        daemon.stderr.on("data", (data) => {
+            errorOutput += data.toString();
+        });
+
+        const onDaemonExit = (message) => {
+            if (this.daemon === daemon) {
+                if (!answered) {
+                    // Calls fall back to one process each until the retry time
+                    this.daemonFailures += 1;
+                    const delay = Math.min(DAEMON_RETRY_MS * 2 ** (this.daemonFailures - 1), DAEMON_RETRY_MAX_MS);
+                    this.daemonRetryAt = Date.now() + delay;
+                }
+                const error = new Error(message);
+                error.code = "DAEMON_UNAVAILABLE";
+                this.stopDaemon(error);
+            }
+        };
+
+        daemon.on("error", (error) => onDaemonExit(`Wikipedia daemon failed: ${error.message}`));
+        // Writes after the child died but before "close" fires fail with EPIPE
+        daemon.stdin.on("error", (error) => onDaemonExit(`Wikipedia daemon pipe failed: ${error.message}`));
+        daemon.on("close", (code) => onDaemonExit(`Wikipedia daemon exited with code ${code}: ${errorOutput}`));
+
+        // An idle daemon must not keep the Node process alive; pending
+        // requests do so through their timeout timers
+        daemon.unref();
+        daemon.stdin.unref();
+        daemon.stdout.unref();
+        daemon.stderr.unref();
+
+        this.daemon = daemon;
+        return daemon;
+    }
+
+    // Stop the daemon, failing any requests still waiting on it
+    close() {
+        this.stopDaemon();
+    }
+
+    stopDaemon(error = new Error("Wikipedia daemon stopped")) {
+        const daemon = this.daemon;
+        this.daemon = null;
+
+        for (const { reject, timer } of this.pendingRequests.values()) {
+            clearTimeout(timer);
+            reject(error);
+        }
+        this.pendingRequests.clear();
+
+        if (daemon && daemon.exitCode === null) {
+            daemon.kill();
+        }
+    }
+
+    handleDaemonResponse(response) {
+        const pending = this.pendingRequests.get(response.id);
+        if (!pending) {
+            // Startup failures are reported without a request id
+            if (response.error) {
+                console.error("Wikipedia daemon error:", response.error);
+            }
+            return;
+        }
+
+        this.pendingRequests.delete(response.id);
+        clearTimeout(pending.timer);
+
+        if (response.error) {
+            pending.reject(new Error(response.error));
+        } else {
+            pending.resolve(response.result);
+        }
+    }
+
+    sendDaemonRequest(action, params) {
+        return new Promise((resolve, reject) => {
+            if (!this.daemon && Date.now() < this.daemonRetryAt) {
+                const error = new Error("Wikipedia daemon failed to start; retrying later");
+                error.code = "DAEMON_UNAVAILABLE";
+                reject(error);
+                return;
+            }
+
+            let daemon;
+            try {
+                daemon = this.daemon || this.startDaemon();
+            } catch (error) {
+                error.code = "DAEMON_UNAVAILABLE";
+                reject(error);
+                return;
+            }
+
+            const id = this.nextRequestId++;
+
+            // Timeout after 30 seconds. The daemon answers requests in order, so
+            // a stuck request holds up everything behind it: replace the daemon
+            const timer = setTimeout(() => {
+                this.pendingRequests.delete(id);
+                reject(new Error("Wikipedia search timeout"));
+                if (this.daemon === daemon) {
+                    // Requests queued behind it are read-only; let them fall back
+                    const error = new Error("Wikipedia daemon restarted after a request timed out");
+                    error.code = "DAEMON_UNAVAILABLE";
+                    this.stopDaemon(error);
+                }
+            }, 30000);
+
+            this.pendingRequests.set(id, { resolve, reject, timer });
+            daemon.stdin.write(JSON.stringify({ id, action, params }) + "\n");
+        });
+    }
+
     runPythonScript(action, params) {
         return new Promise((resolve, reject) => {
             const pythonProcess = spawn("python3", [
                 path.join(__dirname, "wikipedia_api.py"),
+                "--search-cache",
+                "--format",
+                "binary",
                 action,
                 JSON.stringify(params),
+                this.wikipediaDbPath,
             ]);
 
-            let output = "";
+            const output = [];
             let errorOutput = "";
 
             pythonProcess.stdout.on("data", (data) => {
-                output += data.toString();
+                output.push(data);
             });
 
             pythonProcess.stderr.on("data", (data) => {
@@ -91,15 +290,20 @@ class WikipediaIntegration {
             });
 
             pythonProcess.on("close", (code) => {
+                clearTimeout(timer);
                 if (code === 0) {
-                    resolve(output.trim());
+                    try {
+                        resolve(decodeMessages(Buffer.concat(output))[0]);
+                    } catch (error) {
+                        reject(new Error(`Invalid Wikipedia response: ${error.message}`));
+                    }
                 } else {
                     reject(new Error(`Python script failed: ${errorOutput}`));
                 }
             });
 
             // Timeout after 30 seconds
-            setTimeout(() => {
+            const timer = setTimeout(() => {
                 pythonProcess.kill();
                 reject(new Error("Wikipedia search timeout"));
             }, 30000);
@@ -112,8 +316,7 @@ class WikipediaIntegration {
         }
 
         try {
-            const result = await this.runPythonScript("get_article", { title });
-            const parsed = JSON.parse(result);
+            const parsed = await this.callWikipediaApi("get_article", { title });
             return parsed.article || null;
         } catch (error) {
             console.error("Wikipedia article retrieval failed:", error);
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the Wikipedia API bridge
+Measures the time from process start to the first result, for both the
+one-process-per-call CLI and the long-running --serve mode, and the time
+per request once a --serve process is running
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+API_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wikipedia_api.py')
+
+def time_cli_call(db_path, action, params):
+    """Spawn one CLI call and return seconds until its output arrives"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, API_SCRIPT, action, json.dumps(params), db_path],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    first_byte = process.stdout.read(1)
+    elapsed = time.perf_counter() - start
+    output = first_byte + process.stdout.read()
+    process.wait()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Bridge call failed: {output.decode('utf-8', 'replace')}")
+
+    return elapsed
+
+def time_serve_calls(db_path, action, params, requests):
+    """
+    Start a --serve process, send it requests one at a time, and return the
+    seconds until each response: the first includes the daemon's startup,
+    the rest are answered by the warm daemon. Repeats of one request are
+    answered from the daemon's result caches, as a repeated query would be.
+    """
+    process = subprocess.Popen(
+        [sys.executable, API_SCRIPT, '--serve', db_path],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    timings = []
+    try:
+        for request_id in range(1, requests + 1):
+            start = time.perf_counter()
+            request = {"id": request_id, "action": action, "params": params}
+            process.stdin.write((json.dumps(request) + "\n").encode('utf-8'))
+            process.stdin.flush()
+            response = process.stdout.readline()
+            timings.append(time.perf_counter() - start)
+
+            if not response:
+                raise RuntimeError("Bridge daemon exited without answering")
+    finally:
+        process.stdin.close()
+        process.wait()
+
+    return timings
+
+def summarize(timings):
+    """Summarize timings in milliseconds"""
+    timings_ms = sorted(t * 1000 for t in timings)
+    return {
+        'runs': len(timings_ms),
+        'min_ms': round(timings_ms[0], 1),
+        'median_ms': round(statistics.median(timings_ms), 1),
+        'max_ms': round(timings_ms[-1], 1)
+    }
+
+def main():
+    """Main CLI interface"""
+    parser = argparse.ArgumentParser(description='Wikipedia bridge startup benchmark')
+    parser.add_argument('--db-path', default='./wikipedia.db',
+                       help='SQLite database path')
+    parser.add_argument('--runs', type=int, default=10,
+                       help='Number of process starts per mode')
+    parser.add_argument('--requests', type=int, default=20,
+                       help='Requests timed against each running --serve process after the first')
+    parser.add_argument('--action', default='search',
+                       help='Bridge action to time')
+    parser.add_argument('--params', default='{"query": "democracy", "limit": 5}',
+                       help='JSON parameters for the action')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db_path):
+        print(f"Error: {args.db_path} not found")
+        sys.exit(1)
+
+    params = json.loads(args.params)
+
+    serve_first, serve_warm = [], []
+    for _ in range(args.runs):
+        timings = time_serve_calls(args.db_path, args.action, params, 1 + args.requests)
+        serve_first.append(timings[0])
+        serve_warm.extend(timings[1:])
+
+    report = {
+        'action': args.action,
+        'cli': summarize([time_cli_call(args.db_path, args.action, params) for _ in range(args.runs)]),
+        'serve_first': summarize(serve_first)
+    }
+    if serve_warm:
+        report['serve_warm'] = summarize(serve_warm)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
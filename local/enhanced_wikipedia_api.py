@@ -3,53 +3,62 @@
 Enhanced Wikipedia Search with LLM-driven query formation and article review
 """
 
+from __future__ import annotations
+
+import os
 import sys
 import json
-import sqlite3
 import re
-import logging
-from pathlib import Path
-from typing import List, Dict, Optional
-from dataclasses import dataclass
-
-# Import our Wikipedia search modules
-try:
-    from wikipedia_search import WikipediaSearchEngine, WikipediaContextExtractor, WikipediaStats
-except ImportError:
-    print(json.dumps({"error": "Wikipedia search modules not found"}))
-    sys.exit(1)
 
-# Setup logging
-logging.basicConfig(level=logging.WARNING)
+# The search modules are imported on first use (see EnhancedWikipediaAPI.initialize)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import List, Dict
+    from wikipedia_search import SearchResult
 
-@dataclass
-class SearchResult:
-    """Wikipedia search result"""
-    id: int
-    article_id: str
-    title: str
-    summary: str
-    content: str
-    categories: List[str]
-    relevance_score: float
-    snippet: str
+class _InlineExecutor:
+    """Executor that runs each task at once on the calling thread"""
+    
+    def submit(self, fn, *args, **kwargs):
+        from concurrent.futures import Future
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
 
 class EnhancedWikipediaAPI:
     """Enhanced Wikipedia API with LLM-driven search and status feedback"""
     
+    # Worker threads for the independent lookups in search_with_multiple_queries
+    MAX_SEARCH_WORKERS = 4
+    
+    # Words that never name an article on their own or bound a title phrase
+    QUESTION_WORDS = {'what', 'is', 'are', 'how', 'why', 'when', 'where', 'who', 'which', 'the', 'a', 'an'}
+    
+    # Longest question phrase tried as an article title
+    MAX_PHRASE_WORDS = 3
+    
     def __init__(self, db_path="./wikipedia.db"):
         self.db_path = db_path
         self.search_engine = None
         self.context_extractor = None
         self.stats = None
+        self._executor = None
         self.initialize()
     
     def initialize(self):
         """Initialize Wikipedia components"""
         try:
-            if not Path(self.db_path).exists():
+            if not os.path.exists(self.db_path):
                 raise Exception(f"Wikipedia database not found: {self.db_path}")
             
+            try:
+                from wikipedia_search import WikipediaSearchEngine, WikipediaContextExtractor, WikipediaStats
+            except ImportError:
+                raise Exception("Wikipedia search modules not found")
+            
             self.search_engine = WikipediaSearchEngine(self.db_path)
             self.context_extractor = WikipediaContextExtractor(self.search_engine)
             self.stats = WikipediaStats(self.search_engine)
@@ -57,6 +66,46 @@ class EnhancedWikipediaAPI:
         except Exception as e:
             raise Exception(f"Failed to initialize Wikipedia API: {e}")
     
+    def handle(self, action, params):
+        """Route a bridge action to its handler"""
+        if action == 'enhanced_search':
+            return self.search_with_multiple_queries(
+                params.get('question', ''),
+                limit=params.get('limit', 5)
+            )
+        elif action == 'enhanced_context':
+            return self.get_enhanced_context(
+                params.get('question', ''),
+                max_length=params.get('maxLength', 2000)
+            )
+        elif action == 'batch':
+            return self.batch(params)
+        
+        return {"error": f"Unknown action: {action}"}
+    
+    def batch(self, params):
+        """Run several actions on one connection inside one read transaction"""
+        try:
+            operations = params if isinstance(params, list) else params.get('operations', [])
+            
+            results = []
+            with self.search_engine.read_transaction():
+                for operation in operations:
+                    action = operation.get('action', '')
+                    if action == 'batch':
+                        results.append({"error": "Nested batch is not supported"})
+                        continue
+                    
+                    try:
+                        results.append(self.handle(action, operation.get('params') or {}))
+                    except Exception as e:
+                        results.append({"error": f"Action failed: {e}"})
+            
+            return {"results": results, "total": len(results)}
+            
+        except Exception as e:
+            return {"results": [], "error": str(e)}
+    
     def generate_search_queries(self, question: str) -> List[str]:
         """
         Generate multiple search queries from a user question
@@ -92,43 +141,96 @@ class EnhancedWikipediaAPI:
     def extract_key_terms(self, question: str) -> List[str]:
         """Extract key terms from a question"""
         # Remove question words and extract meaningful terms
-        question_words = {'what', 'is', 'are', 'how', 'why', 'when', 'where', 'who', 'which', 'the', 'a', 'an'}
         words = re.findall(r'\b[A-Za-z]+\b', question.lower())
         
         key_terms = []
         for word in words:
-            if word not in question_words and len(word) > 2:
+            if word not in self.QUESTION_WORDS and len(word) > 2:
                 # Capitalize first letter for proper nouns
                 key_terms.append(word.capitalize())
         
         return key_terms
     
+    def extract_phrases(self, question: str) -> List[str]:
+        """
+        Multi-word phrases from the question that may name an article: runs
+        of up to MAX_PHRASE_WORDS consecutive words that neither start nor
+        end with a question word
+        """
+        words = re.findall(r'\b\w+\b', question)
+        
+        phrases = []
+        for size in range(self.MAX_PHRASE_WORDS, 1, -1):
+            for start in range(len(words) - size + 1):
+                phrase = words[start:start + size]
+                if phrase[0].lower() in self.QUESTION_WORDS or phrase[-1].lower() in self.QUESTION_WORDS:
+                    continue
+                phrases.append(" ".join(phrase))
+        
+        return phrases
+    
     def search_with_multiple_queries(self, question: str, limit: int = 10) -> Dict:
         """
         Search Wikipedia using multiple LLM-generated queries with status feedback
         """
         try:
+            status_log = []
+            all_results = {}
+            total_articles_found = 0
+            
+            # The question itself is searched first, alongside the title
+            # lookups; the engine already falls back to fuzzy title matches
+            # for misspellings. Only if it comes up short are the single word
+            # queries fanned out, concurrently, each worker on its own
+            # connection, then merged in the original order
+            executor = self.get_executor()
+            question_future = executor.submit(self.run_query_search, question.strip(), limit)
+            
+            # The issue is that the search isn't finding the actual Poland article
+            # Let's force include title matches for the whole question, its
+            # phrases and its key terms, all resolved in one probe
+            titles_future = executor.submit(self.resolve_titles, self.title_candidates(question))
+            question_log, question_results = question_future.result()
+            
+            # Only a question that finds next to nothing as typed is
+            # spell-corrected, and only if the corrected one finds more
+            search_question, corrections = question, {}
+            if len(question_results) < min(limit, self.search_engine.SPELLING_CORRECT_BELOW):
+                corrected_question, corrections = self.search_engine.correct_query(question)
+                if corrections:
+                    corrected_log, corrected_results = self.run_query_search(corrected_question.strip(), limit)
+                    if len(corrected_results) > len(question_results):
+                        status_log.append("Corrected spelling: " + ", ".join(
+                            f"'{word}' -> '{correction}'" for word, correction in corrections.items()
+                        ))
+                        search_question = corrected_question
+                        question_log, question_results = corrected_log, corrected_results
+                        titles_future = executor.submit(self.resolve_titles,
+                                                        self.title_candidates(search_question))
+                    else:
+                        corrections = {}
+            
             # Generate search queries
-            search_queries = self.generate_search_queries(question)
+            search_queries = self.generate_search_queries(search_question)
             
-            status_log = []
             status_log.append(f"Generated {len(search_queries)} search queries")
             
-            all_results = {}
-            total_articles_found = 0
+            query_futures = []
+            if len(search_queries) > 1:
+                if len(question_results) < limit:
+                    query_futures = [executor.submit(self.run_query_search, query, limit)
+                                     for query in search_queries[1:]]
+                else:
+                    question_log.append(f"Skipped {len(search_queries) - 1} follow-up queries: "
+                                        f"question search found enough articles")
+            
+            exact_title = search_question.strip()
+            phrases = self.extract_phrases(search_question)
+            key_terms = self.extract_key_terms(search_question)
             
             # Search with each query
-            for i, query in enumerate(search_queries):
-                status_log.append(f"Searching Wikipedia with query: '{query}'")
-                
-                # Log the actual SQL query being executed
-                sql_query = f"SELECT * FROM wikipedia_fts WHERE wikipedia_fts MATCH '{query}' ORDER BY rank LIMIT {limit}"
-                status_log.append(f"SQL: {sql_query}")
-                
-                # Use lower threshold for initial search
-                results = self.search_engine.search(query, limit=limit, min_score=0.001)  # Even lower threshold
-                
-                status_log.append(f"Found {len(results)} articles for query '{query}'")
+            for query_log, results in [(question_log, question_results)] + [future.result() for future in query_futures]:
+                status_log.extend(query_log)
                 
                 # Add results to collection (avoid duplicates)
                 for result in results:
@@ -136,69 +238,34 @@ class EnhancedWikipediaAPI:
                         all_results[result.article_id] = result
                         total_articles_found += 1
             
-            # The issue is that the search isn't finding the actual Poland article
-            # Let's force include exact title matches
-            
-            # Check for exact title matches in the database
-            if hasattr(self.search_engine, 'conn'):
-                try:
-                    # Look for exact title matches
-                    exact_sql = "SELECT * FROM wikipedia_articles WHERE title = ? LIMIT 1"
-                    status_log.append(f"SQL: {exact_sql.replace('?', repr(question.strip()))}")
-                    
-                    cursor = self.search_engine.conn.execute(exact_sql, (question.strip(),))
-                    exact_match = cursor.fetchone()
-                    
-                    if exact_match:
-                        status_log.append(f"Found exact title match: '{exact_match['title']}'")
-                        
-                        # Create SearchResult object
-                        from wikipedia_search import SearchResult
-                        exact_result = SearchResult(
-                            id=exact_match['id'],
-                            article_id=exact_match['article_id'],
-                            title=exact_match['title'],
-                            summary=exact_match['summary'] or '',
-                            content=exact_match['content'],
-                            categories=json.loads(exact_match['categories']) if exact_match['categories'] else [],
-                            relevance_score=1.0,  # Perfect match
-                            snippet=exact_match['summary'][:200] if exact_match['summary'] else ''
-                        )
-                        
-                        all_results[exact_result.article_id] = exact_result
-                        total_articles_found += 1
-                except Exception as e:
-                    status_log.append(f"Exact match search failed: {e}")
-            
-            # Also try key terms from the question
-            key_terms = self.extract_key_terms(question)
-            for term in key_terms:
-                try:
-                    term_sql = "SELECT * FROM wikipedia_articles WHERE title = ? LIMIT 1"
-                    status_log.append(f"SQL: {term_sql.replace('?', repr(term))}")
-                    
-                    cursor = self.search_engine.conn.execute(term_sql, (term,))
-                    term_match = cursor.fetchone()
-                    
-                    if term_match and term_match['article_id'] not in all_results:
-                        status_log.append(f"Found key term match: '{term_match['title']}'")
-                        
-                        from wikipedia_search import SearchResult
-                        term_result = SearchResult(
-                            id=term_match['id'],
-                            article_id=term_match['article_id'],
-                            title=term_match['title'],
-                            summary=term_match['summary'] or '',
-                            content=term_match['content'],
-                            categories=json.loads(term_match['categories']) if term_match['categories'] else [],
-                            relevance_score=0.9,  # High relevance for key terms
-                            snippet=term_match['summary'][:200] if term_match['summary'] else ''
-                        )
+            # Check for title matches in the database
+            sql_line, title_matches, error = titles_future.result()
+            status_log.append(sql_line)
+            
+            matched_terms = {}
+            if error:
+                status_log.append(f"Title lookup failed: {error}")
+            else:
+                exact_result = title_matches.get(exact_title)
+                if exact_result:
+                    exact_result.relevance_score = 1.0  # Perfect match
+                    status_log.append(f"Found exact title match: '{exact_result.title}'")
+                    matched_terms[exact_title] = exact_result.title
+                    all_results[exact_result.article_id] = exact_result
+                    total_articles_found += 1
+                
+                for candidates, relevance_score, label in ((phrases, 0.95, "phrase"), (key_terms, 0.9, "key term")):
+                    for term in candidates:
+                        term_result = title_matches.get(term)
+                        if not term_result:
+                            continue
                         
-                        all_results[term_result.article_id] = term_result
-                        total_articles_found += 1
-                except Exception as e:
-                    status_log.append(f"Key term search for '{term}' failed: {e}")
+                        matched_terms[term] = term_result.title
+                        if term_result.article_id not in all_results:
+                            term_result.relevance_score = relevance_score
+                            status_log.append(f"Found {label} match: '{term_result.title}'")
+                            all_results[term_result.article_id] = term_result
+                            total_articles_found += 1
             
             # Convert to list and sort by relevance
             final_results = list(all_results.values())
@@ -210,7 +277,7 @@ class EnhancedWikipediaAPI:
                 status_log.append(f"Reviewing article {i+1} of {min(len(final_results), limit)}: '{result.title}'")
                 
                 # TODO: Use actual LLM for relevance assessment
-                relevance = self.assess_article_relevance(question, result)
+                relevance = self.assess_article_relevance(search_question, result)
                 
                 if relevance > 0.05:  # Lower threshold for keeping articles
                     result.relevance_score = relevance
@@ -239,8 +306,10 @@ class EnhancedWikipediaAPI:
                 "results": result_dicts,
                 "total": len(result_dicts),
                 "question": question,
+                "corrections": corrections,
                 "search_queries": search_queries,
                 "status_log": status_log,
+                "matched_terms": matched_terms,
                 "total_articles_searched": total_articles_found
             }
             
@@ -251,6 +320,74 @@ class EnhancedWikipediaAPI:
                 "status_log": [f"Search failed: {str(e)}"]
             }
     
+    def title_candidates(self, question: str) -> List[str]:
+        """The whole question, its phrases and its key terms, to look up as titles"""
+        return [question.strip()] + self.extract_phrases(question) + self.extract_key_terms(question)
+    
+    def get_executor(self):
+        """Worker pool for concurrent lookups, created on first use"""
+        # Inside a batch every lookup must see the batch's snapshot on its one
+        # connection, so run them inline rather than on worker connections
+        if self.search_engine.conn.in_transaction:
+            return _InlineExecutor()
+        
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.MAX_SEARCH_WORKERS,
+                thread_name_prefix='wikipedia-search'
+            )
+        return self._executor
+    
+    def run_query_search(self, query: str, limit: int):
+        """Run one generated query; returns its status log lines and results"""
+        status_log = [f"Searching Wikipedia with query: '{query}'"]
+        
+        # Log the actual SQL query being executed
+        sql_query = f"SELECT * FROM wikipedia_fts WHERE wikipedia_fts MATCH '{query}' ORDER BY rank LIMIT {limit}"
+        status_log.append(f"SQL: {sql_query}")
+        
+        # Use lower threshold for initial search
+        results = self.search_engine.search(query, limit=limit, min_score=0.001)  # Even lower threshold
+        
+        status_log.append(f"Found {len(results)} articles for query '{query}'")
+        return status_log, results
+    
+    def resolve_titles(self, titles: List[str]):
+        """
+        Resolve candidate titles with one batched probe; returns (SQL log line,
+        {title: result}, error or None). Results share one object per article
+        and carry no content until it is read.
+        """
+        sql_line = f"SQL: batched title lookup of {len(titles)} candidates (normalized key, redirects)"
+        
+        try:
+            rows = self.search_engine.resolve_titles(titles)
+            
+            from wikipedia_search import SearchResult
+            results_by_id = {}
+            matches = {}
+            for title, row in rows.items():
+                result = results_by_id.get(row['id'])
+                if result is None:
+                    result = results_by_id[row['id']] = SearchResult(
+                        id=row['id'],
+                        article_id=row['article_id'],
+                        title=row['title'],
+                        summary=row['summary'] or '',
+                        content=None,
+                        categories=json.loads(row['categories']) if row['categories'] else [],
+                        relevance_score=0.0,
+                        snippet=row['summary'][:200] if row['summary'] else '',
+                        content_loader=self.search_engine.load_content
+                    )
+                matches[title] = result
+            
+            return sql_line, matches, None
+            
+        except Exception as e:
+            return sql_line, {}, e
+    
     def assess_article_relevance(self, question: str, article: SearchResult) -> float:
         """
         Assess how relevant an article is to the question
@@ -342,6 +479,7 @@ class EnhancedWikipediaAPI:
                 "confidence": confidence,
                 "total_articles": len(sources),
                 "question": question,
+                "corrections": search_result.get("corrections", {}),
                 "search_queries": search_result.get("search_queries", []),
                 "status_log": search_result.get("status_log", [])
             }
@@ -378,19 +516,7 @@ def main():
     
     # Route to appropriate method
     try:
-        if action == 'enhanced_search':
-            result = wiki_api.search_with_multiple_queries(
-                params.get('question', ''),
-                limit=params.get('limit', 5)
-            )
-        elif action == 'enhanced_context':
-            result = wiki_api.get_enhanced_context(
-                params.get('question', ''),
-                max_length=params.get('maxLength', 2000)
-            )
-        else:
-            result = {"error": f"Unknown action: {action}"}
-        
+        result = wiki_api.handle(action, params)
         print(json.dumps(result))
         
     except Exception as e:
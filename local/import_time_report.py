@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Import-time report for the Wikipedia bridge entry points
+Runs `python -X importtime` for each module, reports the cumulative import
+cost and its heaviest dependencies, and fails when a module is over budget
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+LOCAL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative import budget per module, in milliseconds
+IMPORT_BUDGET_MS = {
+    'wikipedia_api': 20,
+    'enhanced_wikipedia_api': 20,
+    'wikipedia_search': 25,
+}
+
+def measure_import(module):
+    """Import a module in a fresh interpreter; return (cumulative_us, [(self_us, name)])"""
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)  # Measure with cached bytecode, as in production
+
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=LOCAL_DIR, env=env, capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}: {process.stderr.strip()}")
+
+    cumulative_us = None
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, total_us, name = line[len('import time:'):].split('|')
+        imports.append((int(self_us), name.strip()))
+        if name.rstrip() == f' {module}':
+            cumulative_us = int(total_us)
+
+    if cumulative_us is None:
+        raise RuntimeError(f"No import time reported for {module}")
+
+    return cumulative_us, imports
+
+def report_module(module, budget_ms, runs, top):
+    """Measure one module over several runs and compare against its budget"""
+    measure_import(module)  # Warm the bytecode cache
+
+    samples = [measure_import(module) for _ in range(runs)]
+    totals_ms = [cumulative / 1000 for cumulative, _ in samples]
+
+    # Attribute costs from the fastest run, which carries the least noise
+    _, imports = min(samples, key=lambda sample: sample[0])
+    heaviest = sorted(imports, reverse=True)[:top]
+
+    best_ms = min(totals_ms)
+    return {
+        'budget_ms': budget_ms,
+        'min_ms': round(best_ms, 1),
+        'median_ms': round(statistics.median(totals_ms), 1),
+        'over_budget': best_ms > budget_ms,
+        'heaviest_imports': [{'module': name, 'self_ms': round(self_us / 1000, 2)}
+                             for self_us, name in heaviest]
+    }
+
+def main():
+    """Main CLI interface"""
+    parser = argparse.ArgumentParser(description='Import-time report for the Wikipedia bridge')
+    parser.add_argument('--runs', type=int, default=7,
+                       help='Fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=5,
+                       help='Number of heaviest imports to list per module')
+
+    args = parser.parse_args()
+
+    report = {module: report_module(module, budget_ms, args.runs, args.top)
+              for module, budget_ms in IMPORT_BUDGET_MS.items()}
+
+    print(json.dumps(report, indent=2))
+
+    if any(entry['over_budget'] for entry in report.values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
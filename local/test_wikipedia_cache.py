@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Cache tests for the Wikipedia API bridge
+Covers request coalescing and the caches used by the long-running modes
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import unittest
+from types import SimpleNamespace
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from wikipedia_cache import SingleFlight, BoundedCache, ArticleCache, PersistentSearchCache, default_search_cache_path
+from wikipedia_downloader import WikipediaDatabase
+from wikipedia_search import WikipediaSearchEngine, WikipediaContextExtractor, WikipediaStats
+from wikipedia_test_fixtures import DatabaseTestCase, build_database, build_search_index
+
+ARTICLES = [
+    ("a1", "Poland", "Poland is a country in Central Europe.", "Country in Central Europe", ["Countries"]),
+    ("a2", "Warsaw", "Warsaw is the capital of Poland.", "Capital of Poland", ["Cities"]),
+    ("a3", "Vistula", "The Vistula is the longest river in Poland.", "River in Poland", ["Rivers"]),
+]
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_concurrent_callers_share_one_execution(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return ['value']
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(single_flight.do('key', slow)))
+        leader.start()
+        started.wait(5)
+
+        waiters = [threading.Thread(target=lambda: results.append(single_flight.do('key', slow))) for _ in range(3)]
+        for waiter in waiters:
+            waiter.start()
+        # Waiters register before the leader is released
+        while single_flight.coalesced < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader] + waiters:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True])
+        self.assertTrue(all(value is results[0][0] for value, _ in results))
+        self.assertEqual(single_flight.get_stats(), {'executions': 1, 'coalesced': 3})
+
+    def test_nothing_is_remembered_after_a_call(self):
+        single_flight = SingleFlight()
+        self.assertEqual(single_flight.do('key', lambda: 1), (1, False))
+        self.assertEqual(single_flight.do('key', lambda: 2), (2, False))
+
+    def test_errors_reach_every_caller(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def failing():
+            started.set()
+            release.wait(5)
+            raise ValueError("boom")
+
+        errors = []
+
+        def call():
+            try:
+                single_flight.do('key', failing)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        waiter = threading.Thread(target=call)
+        waiter.start()
+        while single_flight.coalesced < 1:
+            time.sleep(0.001)
+        release.set()
+        leader.join(5)
+        waiter.join(5)
+
+        self.assertEqual(len(errors), 2)
+        # The key is free again for the next call
+        self.assertEqual(single_flight.do('key', lambda: 3), (3, False))
+
+class BoundedCacheTest(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = BoundedCache(max_entries=2)
+        cache.put('a', 1, 1)
+        cache.put('b', 2, 1)
+        cache.get('a')
+        cache.put('c', 3, 1)
+
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_size_bound_evicts_until_under_budget(self):
+        cache = BoundedCache(max_entries=10, max_bytes=100)
+        for key in 'abcd':
+            cache.put(key, key, 30)
+        cache.put('e', 'e', 50)
+
+        self.assertEqual([cache.get(key) for key in 'abcde'], [None, None, None, 'd', 'e'])
+        self.assertEqual(cache.total_bytes, 80)
+
+    def test_replacing_a_key_keeps_sizes_exact(self):
+        cache = BoundedCache(max_bytes=100)
+        cache.put('a', 1, 60)
+        cache.put('a', 2, 30)
+
+        self.assertEqual(cache.total_bytes, 30)
+        self.assertEqual(cache.get('a'), 2)
+
+    def test_oversized_values_are_rejected(self):
+        cache = BoundedCache(max_bytes=100, max_entry_fraction=0.5)
+        cache.put('small', 1, 40)
+
+        self.assertFalse(cache.put('large', 2, 60))
+        self.assertEqual(cache.get('small'), 1)
+        self.assertEqual(cache.rejections, 1)
+
+    def test_entries_expire(self):
+        cache = BoundedCache(ttl_seconds=0.05)
+        cache.put('a', 1, 1)
+        self.assertEqual(cache.get('a'), 1)
+
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((cache.expirations, cache.total_bytes), (1, 0))
+
+    def test_new_version_drops_everything(self):
+        cache = BoundedCache()
+        cache.set_version('v1')
+        cache.put('a', 1, 10)
+
+        cache.set_version('v1')
+        self.assertEqual(cache.get('a'), 1)
+
+        cache.set_version('v2')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((cache.invalidations, cache.total_bytes), (1, 0))
+
+class ArticleCacheTest(unittest.TestCase):
+
+    def article(self, article_id):
+        return SimpleNamespace(article_id=article_id)
+
+    def test_titles_follow_evictions(self):
+        cache = ArticleCache(max_entries=1)
+        poland = self.article('a1')
+        cache.put_article(poland, 10, title='Poland')
+        self.assertIs(cache.get_by_title('Poland'), poland)
+
+        cache.put_article(self.article('a2'), 10, title='Warsaw')
+        self.assertIsNone(cache.get_by_title('Poland'))
+        self.assertEqual(cache._titles, {'Warsaw': 'a2'})
+
+    def test_each_requested_spelling_is_an_alias(self):
+        cache = ArticleCache()
+        poland = self.article('a1')
+        cache.put_article(poland, 10, title='Poland')
+        cache.put_article(poland, 10, title='poland')
+
+        self.assertIs(cache.get_by_title('Poland'), poland)
+        self.assertIs(cache.get_by_title('poland'), poland)
+        self.assertIsNone(cache.get_by_title('POLAND'))
+        self.assertIs(cache.get_by_id('a1'), poland)
+
+    def test_alias_can_move_to_another_article(self):
+        cache = ArticleCache(max_entries=2)
+        cache.put_article(self.article('a1'), 10, title='Georgia')
+        state = self.article('a2')
+        cache.put_article(state, 10, title='Georgia')
+        self.assertIs(cache.get_by_title('Georgia'), state)
+
+        # Evicting the first article must not take the moved alias with it
+        cache.put_article(self.article('a3'), 10, title='Tbilisi')
+        self.assertIsNone(cache.get_by_id('a1'))
+        self.assertIs(cache.get_by_title('Georgia'), state)
+
+    def test_rejected_article_gets_no_alias(self):
+        cache = ArticleCache(max_bytes=100, max_entry_fraction=0.5)
+        self.assertFalse(cache.put_article(self.article('a1'), 60, title='Poland'))
+        self.assertIsNone(cache.get_by_title('Poland'))
+
+    def test_new_version_drops_titles(self):
+        cache = ArticleCache()
+        cache.set_version('v1')
+        cache.put_article(self.article('a1'), 10, title='Poland')
+
+        cache.set_version('v2')
+        self.assertIsNone(cache.get_by_title('Poland'))
+        self.assertEqual((cache._titles, cache._aliases), ({}, {}))
+
+class PersistentSearchCacheTest(DatabaseTestCase):
+
+    def open_cache(self, **options):
+        cache = PersistentSearchCache(os.path.join(self.tmp_dir, f"{self.id()}.search-cache"), **options)
+        self.addCleanup(lambda: cache.conn.close())
+        return cache
+
+    def stored(self, cache):
+        rows = cache.conn.execute('SELECT cache_key FROM search_cache ORDER BY cache_key').fetchall()
+        entry_count = cache.conn.execute('SELECT entry_count FROM search_cache_meta').fetchone()[0]
+        return [row[0] for row in rows], entry_count
+
+    def test_entries_are_shared_between_instances(self):
+        writer = self.open_cache()
+        writer.put('key', 'v1', {'entries': [[1, 0.5, None]]})
+
+        reader = PersistentSearchCache(writer.path)
+        self.addCleanup(lambda: reader.conn.close())
+        self.assertEqual(reader.get('key', 'v1'), {'entries': [[1, 0.5, None]]})
+
+    def test_new_content_version_purges_old_entries(self):
+        cache = self.open_cache()
+        cache.put('a', 'v1', 1)
+        cache.put('b', 'v1', 2)
+
+        self.assertIsNone(cache.get('a', 'v2'))
+        self.assertEqual(self.stored(cache), ([], 0))
+
+        # Another process that still has the old version cached purges too
+        other = PersistentSearchCache(cache.path)
+        self.addCleanup(lambda: other.conn.close())
+        other.put('c', 'v2', 3)
+        self.assertIsNone(other.get('a', 'v1'))
+        self.assertEqual(self.stored(other), ([], 0))
+
+    def test_entry_count_bounds_the_file(self):
+        cache = self.open_cache(max_entries=3, touch_seconds=0)
+        for key in 'abc':
+            cache.put(key, 'v1', key)
+            time.sleep(0.001)
+        # A hit makes "a" the most recently used entry
+        cache.get('a', 'v1')
+        cache.put('b', 'v1', 'b2')
+        cache.put('d', 'v1', 'd')
+
+        self.assertEqual(self.stored(cache), (['a', 'b', 'd'], 3))
+        self.assertEqual(cache.get('b', 'v1'), 'b2')
+
+    def test_hits_skip_recent_touches(self):
+        cache = self.open_cache(touch_seconds=60)
+        cache.put('a', 'v1', 1)
+        last_used = cache.conn.execute('SELECT last_used FROM search_cache').fetchone()[0]
+
+        cache.get('a', 'v1')
+        self.assertEqual(cache.conn.execute('SELECT last_used FROM search_cache').fetchone()[0], last_used)
+
+class ContentVersionTest(DatabaseTestCase):
+    """Long-running caches must not serve results from before a re-ingest"""
+
+    def setUp(self):
+        self.test_db_path = os.path.join(self.tmp_dir, f"{self.id()}.db")
+        build_database(self.test_db_path, ARTICLES)
+
+    def reingest(self, article_id, title, content, summary):
+        """Re-ingest one article the way the downloader does, stamping a new content version"""
+        db = WikipediaDatabase(self.test_db_path)
+        db.initialize()
+        db.insert_article(article_id, title, content, summary, json.dumps(["Rivers"]))
+        build_search_index(db)
+        db.update_metadata()
+        db.close()
+
+    def open_engine(self, **options):
+        engine = WikipediaSearchEngine(self.test_db_path, **options)
+        self.addCleanup(engine.close)
+        # Notice the new version on the next call instead of seconds later
+        engine.CONTENT_VERSION_CHECK_SECONDS = 0
+        return engine
+
+    def search_titles(self, engine, query):
+        return [result.title for result in engine.search(query)]
+
+    def test_search_cache_follows_reingest(self):
+        engine = self.open_engine(cache_results=True)
+        self.assertEqual(self.search_titles(engine, 'river'), ['Vistula'])
+        self.assertEqual(self.search_titles(engine, 'river'), ['Vistula'])
+        self.assertEqual(engine.search_cache.hits, 1)
+
+        self.reingest('a3', 'Vistula', "The Vistula flows through Krakow and Warsaw.", "Flows through Krakow")
+
+        self.assertEqual(self.search_titles(engine, 'river'), [])
+        self.assertEqual(self.search_titles(engine, 'krakow'), ['Vistula'])
+        self.assertEqual(engine.search_cache.invalidations, 1)
+
+    def test_persistent_cache_follows_reingest(self):
+        cache_path = default_search_cache_path(self.test_db_path)
+        engine = self.open_engine(persistent_cache_path=cache_path)
+        self.assertEqual(self.search_titles(engine, 'river'), ['Vistula'])
+        self.assertTrue(os.path.exists(cache_path))
+
+        # A second process reads the first one's page
+        other = self.open_engine(persistent_cache_path=cache_path)
+        self.assertEqual(self.search_titles(other, 'river'), ['Vistula'])
+
+        self.reingest('a3', 'Vistula', "The Vistula flows through Krakow and Warsaw.", "Flows through Krakow")
+
+        for current in (engine, other):
+            self.assertEqual(self.search_titles(current, 'river'), [])
+            self.assertEqual(self.search_titles(current, 'krakow'), ['Vistula'])
+
+    def test_article_cache_follows_reingest(self):
+        engine = self.open_engine(cache_results=True)
+        self.assertIn('longest river', engine.get_article_by_title('Vistula').content)
+        self.assertIn('longest river', engine.get_article_by_id('a3').content)
+
+        self.reingest('a3', 'Vistula', "The Vistula flows through Krakow and Warsaw.", "Flows through Krakow")
+
+        self.assertIn('Krakow', engine.get_article_by_title('Vistula').content)
+        self.assertIn('Krakow', engine.get_article_by_id('a3').content)
+        self.assertEqual(engine.article_cache.invalidations, 1)
+
+    def test_context_cache_hands_out_copies(self):
+        extractor = WikipediaContextExtractor(self.open_engine(), cache_contexts=True)
+        first = extractor.get_context_for_query('river')
+        first.sources[0].title = 'Changed by the caller'
+
+        second = extractor.get_context_for_query('River')
+        self.assertEqual(extractor.context_cache.hits, 1)
+        self.assertEqual(second.query, 'River')
+        self.assertEqual([source.title for source in second.sources], ['Vistula'])
+
+    def test_context_cache_follows_reingest(self):
+        extractor = WikipediaContextExtractor(self.open_engine(), cache_contexts=True)
+        self.assertIn('River in Poland', extractor.get_context_for_query('vistula').context_text)
+
+        self.reingest('a3', 'Vistula', "The Vistula flows through Krakow and Warsaw.", "Flows through Krakow")
+
+        context = extractor.get_context_for_query('vistula')
+        self.assertNotIn('River in Poland', context.context_text)
+        self.assertIn('Flows through Krakow', context.context_text)
+        self.assertEqual(extractor.context_cache.invalidations, 1)
+
+    def test_stats_snapshot_follows_reingest(self):
+        stats = WikipediaStats(self.open_engine())
+        self.assertEqual(stats.get_snapshot()['database']['total_articles'], 3)
+
+        db = WikipediaDatabase(self.test_db_path)
+        db.initialize()
+        db.insert_article('a4', 'Krakow', "Krakow is a city on the Vistula.", "City in Poland", json.dumps(["Cities"]))
+        db.update_metadata()
+        db.update_stats_snapshot()
+        db.close()
+
+        snapshot = stats.get_snapshot()
+        self.assertEqual(snapshot['database']['total_articles'], 4)
+        self.assertEqual(snapshot['database']['total_categories'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
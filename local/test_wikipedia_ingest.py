@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Ingest tests for the Wikipedia database
+Re-ingests articles and checks that the derived tables kept current by
+triggers match a rebuild from scratch
+"""
+
+import os
+import sys
+import json
+import unittest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from wikipedia_downloader import WikipediaDatabase, WikipediaXMLProcessor
+from wikipedia_search import WikipediaSearchEngine
+from wikipedia_test_fixtures import DatabaseTestCase, build_search_index
+
+PAGE_TEXT = "{name} is an article long enough to be kept by the dump processor, with some filler text. [[Category:{category}]] [[Category:All articles]]"
+
+DUMP = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">
+  <page>
+    <title>Poland</title>
+    <ns>0</ns>
+    <id>1</id>
+    <revision>
+      <id>101</id>
+      <contributor><username>Editor</username><id>7</id></contributor>
+      <text>{poland}</text>
+    </revision>
+  </page>
+  <page>
+    <title>Warsaw</title>
+    <ns>0</ns>
+    <id>2</id>
+    <revision>
+      <id>102</id>
+      <contributor><username>Editor</username><id>7</id></contributor>
+      <text>{warsaw}</text>
+    </revision>
+  </page>
+</mediawiki>
+""".format(poland=PAGE_TEXT.format(name="Poland", category="Countries"),
+           warsaw=PAGE_TEXT.format(name="Warsaw", category="Cities"))
+
+class IngestTest(DatabaseTestCase):
+
+    def open_database(self):
+        """A new, empty database for this test"""
+        db = WikipediaDatabase(os.path.join(self.tmp_dir, f"{self.id()}.db"))
+        db.initialize()
+        self.addCleanup(db.close)
+        return db
+
+    def insert(self, db, article_id, title, categories):
+        db.insert_article(article_id, title, f"Content of {title}", f"Summary of {title}", json.dumps(categories))
+
+    def category_rows(self, db):
+        """Maintained category tables, by name rather than by dictionary id"""
+        counts = set(db.conn.execute('SELECT category, article_count FROM category_counts'))
+        members = set(db.conn.execute('''
+            SELECT c.name, ac.title, ac.article_rowid
+            FROM article_categories ac JOIN category_names c ON c.id = ac.category_id
+        '''))
+        return counts, members
+
+    def assert_categories_match_rebuild(self, db):
+        maintained = self.category_rows(db)
+        db.rebuild_category_counts()
+        db.rebuild_article_categories()
+        self.assertEqual(maintained, self.category_rows(db))
+
+    def test_reingest_with_overlapping_categories(self):
+        db = self.open_database()
+        self.insert(db, 'a1', 'Poland', ['Countries', 'Europe'])
+        self.insert(db, 'a2', 'Warsaw', ['Europe', 'Cities'])
+
+        # Same article_id again: one category kept, one dropped, one new
+        self.insert(db, 'a1', 'Poland', ['Europe', 'Republics'])
+
+        counts, members = self.category_rows(db)
+        self.assertEqual(counts, {('Europe', 2), ('Cities', 1), ('Republics', 1)})
+        self.assertEqual({(name, title) for name, title, _ in members}, {
+            ('Europe', 'Poland'), ('Europe', 'Warsaw'), ('Cities', 'Warsaw'), ('Republics', 'Poland')
+        })
+        self.assert_categories_match_rebuild(db)
+
+    def test_reingest_with_renamed_title(self):
+        db = self.open_database()
+        self.insert(db, 'a1', 'Polska', ['Countries'])
+        self.insert(db, 'a1', 'Poland', ['Countries'])
+
+        _, members = self.category_rows(db)
+        self.assertEqual({(name, title) for name, title, _ in members}, {('Countries', 'Poland')})
+        self.assert_categories_match_rebuild(db)
+
+    def test_category_counts_follow_deletes(self):
+        db = self.open_database()
+        self.insert(db, 'a1', 'Poland', ['Countries', 'Europe'])
+        self.insert(db, 'a2', 'Warsaw', ['Europe'])
+
+        # Re-ingested without categories, then removed altogether
+        self.insert(db, 'a1', 'Poland', [])
+        counts, _ = self.category_rows(db)
+        self.assertEqual(counts, {('Europe', 1)})
+
+        db.conn.execute("DELETE FROM wikipedia_articles WHERE article_id = 'a2'")
+        self.assertEqual(self.category_rows(db), (set(), set()))
+        self.assert_categories_match_rebuild(db)
+
+    def test_title_keys_and_redirects_after_reingest(self):
+        db = self.open_database()
+        self.insert(db, 'a1', 'Polska', ['Countries'])
+        self.insert(db, 'a1', 'Kraków', ['Cities'])
+        self.insert(db, 'a1', 'Poland', ['Countries'])
+        db.insert_redirect('Polska', 'Poland')
+        db.insert_redirect('Rzeczpospolita_Polska', 'Poland')
+        build_search_index(db)
+
+        keys = db.conn.execute('SELECT title, title_key FROM wikipedia_articles').fetchall()
+        self.assertEqual(keys, [('Poland', 'poland')])
+        db.rebuild_title_keys()
+        self.assertEqual(db.conn.execute('SELECT title, title_key FROM wikipedia_articles').fetchall(), keys)
+
+        engine = WikipediaSearchEngine(db.db_path)
+        self.addCleanup(engine.close)
+        for title in ('Poland', 'POLAND', 'polska', 'Rzeczpospolita Polska'):
+            self.assertEqual(engine.find_title_row(title)['article_id'], 'a1', title)
+        self.assertIsNone(engine.find_title_row('Krakow'))
+
+    def test_title_prefixes_after_reingest(self):
+        db = self.open_database()
+        for i, title in enumerate(['Warsaw', 'Warta', 'Wars of Poland', 'Wawel', 'Vistula']):
+            db.insert_article(f"a{i}", title, "word " * (i + 1), "", "[]")
+        db.rebuild_title_prefixes(scan_limit=2, top_k=2)
+
+        # Renamed out of the crowded "war" prefix and lengthened
+        db.insert_article('a0', 'Wroclaw', "word " * 10, "", "[]")
+        db.rebuild_title_prefixes(scan_limit=2, top_k=2)
+
+        articles = db.conn.execute('SELECT title_key, word_count, title, id FROM wikipedia_articles').fetchall()
+        expected = set()
+        for prefix in {key[:length] for key, *_ in articles for length in range(1, len(key) + 1)}:
+            matches = sorted((-word_count, title, rowid) for key, word_count, title, rowid in articles
+                             if key.startswith(prefix))
+            if len(matches) > 2:
+                expected.update((prefix, rank, rowid) for rank, (_, _, rowid) in enumerate(matches[:2], 1))
+
+        self.assertEqual(set(db.conn.execute('SELECT prefix, rank, article_rowid FROM title_prefixes')), expected)
+        self.assertEqual({prefix for prefix, _, _ in expected}, {'w', 'wa'})
+
+    def test_title_trigrams_after_reingest(self):
+        db = self.open_database()
+        self.insert(db, 'a1', 'Warsaw', ['Cities'])
+        self.insert(db, 'a2', 'Vistula', ['Rivers'])
+        db.rebuild_title_trigrams()
+
+        self.insert(db, 'a1', 'Wroclaw', ['Cities'])
+        db.rebuild_title_trigrams()
+
+        # The index reads its text from wikipedia_articles, and must agree with it
+        db.conn.execute("INSERT INTO title_trigrams (title_trigrams, rank) VALUES ('integrity-check', 1)")
+
+        def matches(fragment):
+            return [row[0] for row in db.conn.execute('''
+                SELECT a.article_id FROM title_trigrams t JOIN wikipedia_articles a ON a.id = t.rowid
+                WHERE title_trigrams MATCH ?
+            ''', (f'"{fragment}"',))]
+
+        self.assertEqual(matches('rocla'), ['a1'])
+        self.assertEqual(matches('arsa'), [])
+
+    def test_article_weights_after_reingest(self):
+        db = self.open_database()
+        self.insert(db, 'a1', 'Poland', ['Countries'])
+        self.insert(db, 'a2', 'Warsaw', ['Cities'])
+        db.rebuild_article_weights()
+
+        db.insert_article('a1', 'Poland', "Poland is a country in Central Europe", "", "[]")
+        db.rebuild_article_weights()
+
+        # Each article owns an interval as wide as its word count
+        rows = db.conn.execute('''
+            SELECT a.article_id, w.cumulative FROM article_weights w
+            JOIN wikipedia_articles a ON a.id = w.article_rowid
+            ORDER BY w.cumulative
+        ''').fetchall()
+        self.assertEqual(rows, [('a1', 7), ('a2', 10)])
+
+    def test_dump_pages_keep_their_own_ids(self):
+        db = self.open_database()
+        dump_path = os.path.join(self.tmp_dir, f"{self.id()}.xml")
+        with open(dump_path, 'w', encoding='utf-8') as f:
+            f.write(DUMP)
+
+        processor = WikipediaXMLProcessor(db)
+        processor.process_xml_stream(dump_path)
+
+        rows = db.conn.execute('SELECT article_id, title FROM wikipedia_articles ORDER BY article_id').fetchall()
+        self.assertEqual(rows, [('1', 'Poland'), ('2', 'Warsaw')])
+        self.assertEqual(processor.articles_processed, 2)
+
+        counts, _ = self.category_rows(db)
+        self.assertEqual(counts, {('Countries', 1), ('Cities', 1), ('All articles', 2)})
+        self.assert_categories_match_rebuild(db)
+
+if __name__ == '__main__':
+    unittest.main()
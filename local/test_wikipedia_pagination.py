@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Cursor pagination tests for the Wikipedia API bridge
+Pages through search and category listings and checks that the pages join
+up to the same results as one large-limit request
+"""
+
+import os
+import sys
+import unittest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from wikipedia_api import WikipediaAPI
+from wikipedia_test_fixtures import DatabaseTestCase
+
+ARTICLE_COUNT = 300
+
+class PaginationTest(DatabaseTestCase):
+
+    @classmethod
+    def articles(cls):
+        """Small corpus where the query words sit in titles, summaries or only in content"""
+        for i in range(ARTICLE_COUNT):
+            if i % 3 == 0:
+                title, summary = f"Poland quantum physics {i}", f"Summary of article {i}"
+            elif i % 3 == 1:
+                title, summary = f"Article {i}", f"Poland and quantum physics, part {i}"
+            else:
+                title, summary = f"Article {i}", f"Summary of article {i}"
+
+            content = " ".join(["Poland quantum physics"] * (i % 7 + 1) + ["filler text"] * (i % 11 + 1))
+            categories = ["Countries" if i % 2 else "Science", "All articles"]
+            yield f"article-{i}", title, content, summary, categories
+
+    def apis(self):
+        """One uncached API per test, and one going through the result caches"""
+        return [
+            ('uncached', WikipediaAPI(self.db_path)),
+            ('cached', WikipediaAPI(self.db_path, long_running=True, search_cache=True)),
+        ]
+
+    def collect_pages(self, api, action, params, key='results'):
+        """Follow next_cursor until it runs out; returns the ids in page order"""
+        ids = []
+        cursor = None
+        for _ in range(ARTICLE_COUNT):
+            page_params = dict(params, cursor=cursor) if cursor else params
+            response = api.handle(action, page_params)
+            self.assertNotIn('error', response)
+
+            ids.extend(item['id'] for item in response[key])
+            cursor = response['next_cursor']
+            if cursor is None:
+                return ids
+
+        self.fail("Pagination did not terminate")
+
+    def test_search_pages_match_single_query(self):
+        for name, api in self.apis():
+            for ranking in ('legacy', 'bm25'):
+                for query in ('poland', 'quantum physics'):
+                    with self.subTest(api=name, ranking=ranking, query=query):
+                        expected = [result['id'] for result in api.handle('search', {
+                            'query': query, 'limit': 1000, 'ranking': ranking
+                        })['results']]
+
+                        paged = self.collect_pages(api, 'search', {
+                            'query': query, 'limit': 7, 'ranking': ranking
+                        })
+
+                        self.assertTrue(expected)
+                        self.assertEqual(paged, expected)
+
+    def test_stream_search_pages_match_single_query(self):
+        api = WikipediaAPI(self.db_path)
+        expected = [result['id'] for result in api.handle('search', {'query': 'poland', 'limit': 1000})['results']]
+
+        paged = []
+        cursor = None
+        while True:
+            params = {'query': 'poland', 'limit': 7}
+            if cursor:
+                params['cursor'] = cursor
+            records = list(api.stream('search', params))
+            paged.extend(record['result']['id'] for record in records if record['type'] == 'result')
+            cursor = records[-1]['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(paged, expected)
+
+    def test_category_pages_match_single_query(self):
+        for name, api in self.apis():
+            for category in ('Countries', 'Science', 'All articles'):
+                with self.subTest(api=name, category=category):
+                    expected = [result['id'] for result in api.handle('category', {
+                        'category': category, 'limit': 1000
+                    })['results']]
+
+                    paged = self.collect_pages(api, 'category', {'category': category, 'limit': 6})
+
+                    self.assertTrue(expected)
+                    self.assertEqual(paged, expected)
+
+    def test_cursor_is_bound_to_its_listing(self):
+        api = WikipediaAPI(self.db_path)
+        cursor = api.handle('search', {'query': 'poland', 'limit': 5})['next_cursor']
+        self.assertIsNotNone(cursor)
+
+        response = api.handle('search', {'query': 'quantum', 'limit': 5, 'cursor': cursor})
+        self.assertIn('error', response)
+
+        response = api.handle('category', {'category': 'Science', 'cursor': 'not a cursor'})
+        self.assertIn('error', response)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Search engine tests for the Wikipedia API bridge
+Covers ranking in SQLite and batched title resolution
+"""
+
+import os
+import sys
+import unittest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from wikipedia_api import WikipediaAPI
+from wikipedia_downloader import WikipediaDatabase
+from wikipedia_search import WikipediaSearchEngine
+from wikipedia_test_fixtures import DatabaseTestCase
+
+ARTICLES = [
+    ("Georgia", "Georgia is a country in the Caucasus.", "Country in the Caucasus"),
+    ("GEORGIA", "GEORGIA is an acronym used by a research project.", ""),
+    ("Georgia (U.S. state)", "Georgia is a state in the Southeastern United States.", "State of the United States"),
+    ("Kraków", "Kraków is a city in southern Poland on the Vistula.", "City in Poland"),
+    ("Vistula", "The Vistula is the longest river in Poland. Krakow and Warsaw lie on it.", "River in Poland"),
+    ("Tbilisi", "Tbilisi is the capital of Georgia.", "Capital of Georgia"),
+]
+
+REDIRECTS = [
+    ("Sakartvelo", "Georgia"),
+    ("Cracow", "Kraków"),
+    ("Peach State", "Georgia (U.S. state)"),
+]
+
+# Unrelated articles, so that query words are not in every article
+FILLER_TOPICS = ["music", "mountain", "painting", "cooking", "football", "astronomy"]
+
+class SearchEngineTest(DatabaseTestCase):
+
+    @classmethod
+    def articles(cls):
+        for i, (title, content, summary) in enumerate(ARTICLES):
+            yield f"article-{i}", title, content, summary, ["All articles"]
+
+        for i, topic in enumerate(FILLER_TOPICS * 3):
+            yield f"filler-{i}", f"{topic.capitalize()} {i}", f"An article about {topic}, number {i}.", "", ["All articles"]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        db = WikipediaDatabase(cls.db_path)
+        db.initialize()
+        for title, target in REDIRECTS:
+            db.insert_redirect(title, target)
+        db.conn.commit()
+        db.close()
+
+    def setUp(self):
+        self.engine = WikipediaSearchEngine(self.db_path)
+        self.addCleanup(self.engine.close)
+
+    def test_bm25_ranks_title_matches_first(self):
+        results = self.engine.search('georgia', ranking='bm25', min_score=0.0)
+        scores = [result.relevance_score for result in results]
+
+        # Both spellings of the exact title match outrank the rest
+        self.assertEqual({result.title for result in results[:2]}, {'Georgia', 'GEORGIA'})
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertTrue(all(0.0 <= score <= 1.0 for score in scores))
+        self.assertIn('Tbilisi', [result.title for result in results])
+
+    def test_bm25_threshold_applies_after_ranking(self):
+        everything = self.engine.search('georgia', ranking='bm25', min_score=0.0)
+        cutoff = everything[2].relevance_score
+        kept = self.engine.search('georgia', ranking='bm25', min_score=cutoff)
+
+        self.assertEqual([result.id for result in kept],
+                         [result.id for result in everything if result.relevance_score >= cutoff])
+
+    def test_bm25_pages_continue_the_ranking(self):
+        expected = [result.id for result in self.engine.search('georgia', limit=10, ranking='bm25', min_score=0.0)]
+
+        paged = []
+        after = None
+        while True:
+            results, after = self.engine.search_page('georgia', limit=2, min_score=0.0, ranking='bm25', after=after)
+            paged.extend(result.id for result in results)
+            if after is None:
+                break
+
+        self.assertEqual(paged, expected)
+
+    def test_snippets_are_opt_in(self):
+        api = WikipediaAPI(self.db_path)
+
+        response = api.handle('search', {'query': 'caucasus', 'ranking': 'bm25'})
+        self.assertTrue(response['results'])
+        self.assertNotIn('snippet', response['results'][0])
+
+        response = api.handle('search', {'query': 'caucasus', 'ranking': 'bm25', 'fields': ['title', 'snippet']})
+        self.assertIn('<mark>', response['results'][0]['snippet'])
+
+    def test_resolve_titles_agrees_with_single_lookups(self):
+        titles = ['Georgia', 'GEORGIA', 'georgia', 'Sakartvelo', 'Peach_State', 'krakow', 'Cracow',
+                  'Vistula', 'Warsaw', 'Tbilisi ']
+        resolved = self.engine.resolve_titles(titles)
+
+        for title in titles:
+            row = self.engine.find_title_row(title)
+            if row is None:
+                self.assertNotIn(title, resolved)
+            else:
+                self.assertEqual(resolved[title]['article_id'], row['article_id'], title)
+
+        self.assertEqual(resolved['GEORGIA']['title'], 'GEORGIA')
+        self.assertEqual(resolved['Sakartvelo']['title'], 'Georgia')
+        self.assertEqual(resolved['Cracow']['title'], 'Kraków')
+        self.assertNotIn('Warsaw', resolved)
+
+if __name__ == '__main__':
+    unittest.main()
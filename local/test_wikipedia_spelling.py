@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Spelling correction tests for the Wikipedia API bridge
+Checks which query words get corrected, and that corrections are only used
+when the query as typed comes up short
+"""
+
+import os
+import sys
+import unittest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from wikipedia_api import WikipediaAPI
+from wikipedia_test_fixtures import DatabaseTestCase
+
+ARTICLES = [
+    ("Poland", "Poland is a country in Central Europe. The capital of Poland is Warsaw."),
+    ("History of Poland", "The history of Poland spans over a thousand years."),
+    ("Warsaw", "Warsaw is the capital and largest city of Poland."),
+    ("Polish language", "Polish is the official language of Poland."),
+    ("Krakow", "Krakow is the second largest city in Poland."),
+    ("Vistula", "The Vistula is the longest river in Poland."),
+    ("Quantum mechanics", "Quantum mechanics describes nature at the scale of atoms."),
+    ("Physics", "Physics is the natural science of matter and energy."),
+    ("Text editor", "A text editor edits plain text files."),
+    ("Typography", "Typography arranges type to make written text legible."),
+    ("Rare word", "Palant appears exactly once in the corpus."),
+]
+
+# Unrelated articles, so that common query words are not in every article
+FILLER_TOPICS = ["music", "river", "mountain", "painting", "cooking", "football", "astronomy", "chess"]
+
+class SpellingCorrectionTest(DatabaseTestCase):
+
+    vocabulary = True
+
+    @classmethod
+    def articles(cls):
+        """Small corpus with a few distinct topics and one rare word"""
+        for i, (title, content) in enumerate(ARTICLES):
+            yield f"article-{i}", title, content, "", ["All articles"]
+
+        for i, topic in enumerate(FILLER_TOPICS * 3):
+            yield f"filler-{i}", f"{topic.capitalize()} {i}", f"An article about {topic}, number {i}.", "", ["All articles"]
+
+    def setUp(self):
+        self.api = WikipediaAPI(self.db_path)
+
+    def search_ids(self, query, **params):
+        """Search with bm25 ranking, which has no relevance cut-off on this small corpus"""
+        response = self.api.handle('search', dict({'ranking': 'bm25'}, **params, query=query))
+        self.assertNotIn('error', response)
+        return [result['id'] for result in response['results']], response
+
+    def test_misspelled_query_is_corrected(self):
+        expected, _ = self.search_ids('poland', limit=10)
+        ids, response = self.search_ids('polnad', limit=10)
+
+        self.assertTrue(expected)
+        self.assertEqual(response['corrections'], {'polnad': 'poland'})
+        self.assertEqual(response['corrected_query'], 'poland')
+        self.assertEqual(ids, expected)
+
+    def test_corrections_can_be_turned_off(self):
+        ids, response = self.search_ids('polnad', limit=10, correct=False)
+
+        self.assertEqual(response['corrections'], {})
+        self.assertNotIn('corrected_query', response)
+
+    def test_rare_word_is_not_corrected(self):
+        ids, response = self.search_ids('palant')
+
+        self.assertEqual(response['corrections'], {})
+        self.assertEqual(len(ids), 1)
+
+    def test_short_words_allow_one_edit(self):
+        _, response = self.search_ids('tezt')
+        self.assertEqual(response['corrections'], {'tezt': 'text'})
+
+        _, response = self.search_ids('toxd')
+        self.assertEqual(response['corrections'], {})
+
+    def test_pages_continue_the_corrected_query(self):
+        expected, _ = self.search_ids('poland', limit=10)
+
+        paged = []
+        params = {'query': 'polnad', 'limit': 2}
+        while True:
+            ids, response = self.search_ids(**params)
+            self.assertEqual(response['corrections'], {'polnad': 'poland'})
+            paged.extend(ids)
+            if response['next_cursor'] is None:
+                break
+            params['cursor'] = response['next_cursor']
+
+        self.assertEqual(paged, expected)
+
+    def test_stream_and_context_report_corrections(self):
+        records = list(self.api.stream('search', {'query': 'polnad', 'limit': 10}))
+        self.assertTrue(any(record['type'] == 'result' for record in records))
+        self.assertEqual(records[-1]['corrections'], {'polnad': 'poland'})
+
+        response = self.api.handle('context', {'query': 'polnad'})
+        self.assertEqual(response['corrections'], {'polnad': 'poland'})
+        self.assertTrue(response['sources'])
+
+    def test_stream_holds_back_only_while_a_correction_may_apply(self):
+        iter_search = self.api.search_engine.iter_search
+        pulled = []
+
+        def counting_iter_search(*args, **kwargs):
+            results = iter_search(*args, **kwargs)
+            while True:
+                try:
+                    result = next(results)
+                except StopIteration as stop:
+                    # Keep the resume key the generator returns
+                    return stop.value
+                pulled.append(result)
+                yield result
+
+        self.api.search_engine.iter_search = counting_iter_search
+        self.addCleanup(delattr, self.api.search_engine, 'iter_search')
+
+        def pulled_before_first_result(params):
+            pulled.clear()
+            records = self.api.stream('search', dict(params, query='poland', limit=10, ranking='bm25'))
+            for record in records:
+                if record['type'] == 'result':
+                    records.close()
+                    return len(pulled)
+
+        self.assertEqual(pulled_before_first_result({}), self.api.search_engine.SPELLING_CORRECT_BELOW)
+        self.assertEqual(pulled_before_first_result({'correct': False}), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Title suggestion tests for the Wikipedia API bridge
+Checks that typeahead ranks every matching title, not just the first ones
+in alphabetical order
+"""
+
+import os
+import sys
+import unittest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from wikipedia_downloader import WikipediaDatabase
+from wikipedia_search import WikipediaSearchEngine, normalize_title
+from wikipedia_test_fixtures import DatabaseTestCase
+
+# Far more "Unit..." titles than one range scan reads, sorting before the
+# best article under "unite"
+CROWD_SIZE = 3 * WikipediaSearchEngine.SUGGEST_SCAN_LIMIT
+
+class SuggestTest(DatabaseTestCase):
+
+    @classmethod
+    def articles(cls):
+        for i in range(CROWD_SIZE):
+            words = " ".join(["word"] * (i % 50 + 1))
+            yield f"unita-{i}", f"Unita {i:04d}", words, "", []
+            yield f"unite-{i}", f"Unite {i:04d}", words, "", []
+        yield "united-states", "United States", " ".join(["word"] * 1000), "", []
+        yield "uruguay", "Uruguay", " ".join(["word"] * 500), "", []
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        db = WikipediaDatabase(cls.db_path)
+        db.initialize()
+        db.rebuild_title_prefixes()
+        db.close()
+
+    def setUp(self):
+        self.engine = WikipediaSearchEngine(self.db_path)
+        self.addCleanup(self.engine.close)
+
+    def expected(self, prefix, limit):
+        """Every title under the prefix, ranked in Python"""
+        rows = self.engine.conn.execute('SELECT article_id, title, word_count FROM wikipedia_articles').fetchall()
+        matches = [row for row in rows if normalize_title(row['title']).startswith(normalize_title(prefix))]
+        matches.sort(key=lambda row: (-row['word_count'], row['title']))
+        return [(row['article_id'], row['title']) for row in matches[:limit]]
+
+    def test_popular_title_late_in_a_crowded_range(self):
+        for prefix in ('u', 'un', 'unit', 'unite', 'united', 'United S'):
+            with self.subTest(prefix=prefix):
+                suggestions = self.engine.suggest_titles(prefix, 5)
+                self.assertEqual(suggestions[0], ('united-states', 'United States'))
+                self.assertEqual(suggestions, self.expected(prefix, 5))
+
+    def test_small_ranges_are_ranked_exactly(self):
+        for prefix in ('uru', 'unita 01', 'unite 0042', 'unix'):
+            with self.subTest(prefix=prefix):
+                self.assertEqual(self.engine.suggest_titles(prefix, 5), self.expected(prefix, 5))
+
+    def test_limit_is_capped(self):
+        suggestions = self.engine.suggest_titles('unit', 50)
+        self.assertEqual(len(suggestions), WikipediaSearchEngine.SUGGEST_TOP_K)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,27 +4,64 @@ Wikipedia API Bridge
 Provides Python-based Wikipedia search functionality for Node.js application
 """
 
+import os
 import sys
 import json
-import sqlite3
-import logging
-from pathlib import Path
+import time
 
-# Import our Wikipedia search modules
-try:
-    from wikipedia_search import WikipediaSearchEngine, WikipediaContextExtractor, WikipediaStats
-except ImportError:
-    print(json.dumps({"error": "Wikipedia search modules not found"}))
-    sys.exit(1)
-
-# Setup logging
-logging.basicConfig(level=logging.WARNING)  # Reduce log noise
+# The search modules are imported on first use (see WikipediaAPI.initialize) so
+# that a bridge call only pays for the imports its action needs. Logging is not
+# configured here: the search modules import it lazily, and Python's fallback
+# handler already reports warnings and errors on stderr.
 
 class WikipediaAPI:
     """API bridge for Wikipedia functionality"""
     
-    def __init__(self, db_path="./wikipedia.db"):
+    # Bridge action name -> handler method
+    ACTIONS = {
+        'search': 'search',
+        'context': 'get_context',
+        'article': 'get_article_by_id',  # Keep existing behavior for 'article'
+        'get_article': 'get_article',  # Get by title
+        'random': 'get_random_articles',
+        'category': 'search_by_category',
+        'categories': 'get_categories',
+        'suggest': 'suggest',
+        'stats': 'get_stats',
+        'batch': 'batch',
+    }
+    
+    # Actions that produce records incrementally in streaming mode
+    STREAM_ACTIONS = {
+        'search': 'stream_search',
+        'context': 'stream_context',
+        'article': 'stream_article_by_id',
+        'get_article': 'stream_article',
+    }
+    
+    # Article content is streamed in chunks of this many characters
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
+    # Fields a result can be projected to with the "fields" param; content
+    # is only read from the database when asked for
+    RESULT_FIELDS = ('id', 'article_id', 'title', 'summary', 'snippet', 'categories',
+                     'relevance_score', 'content')
+    
+    # Default projections per action. Search snippets are highlighted by
+    # FTS5's snippet(), which reads each hit's content, so they are opt-in
+    SEARCH_FIELDS = ('id', 'article_id', 'title', 'summary', 'categories', 'relevance_score')
+    RANDOM_FIELDS = ('id', 'article_id', 'title', 'summary', 'snippet', 'categories')
+    CATEGORY_FIELDS = ('id', 'article_id', 'title', 'summary', 'categories')
+    
+    # Long-running modes refresh stats snapshots older than this
+    STATS_MAX_AGE_SECONDS = 300
+    
+    def __init__(self, db_path="./wikipedia.db", read_only=False, long_running=False,
+                 search_cache=False):
         self.db_path = db_path
+        self.read_only = read_only
+        self.long_running = long_running
+        self.search_cache = search_cache
         self.search_engine = None
         self.context_extractor = None
         self.stats = None
@@ -33,46 +70,358 @@ class WikipediaAPI:
     def initialize(self):
         """Initialize Wikipedia components"""
         try:
-            if not Path(self.db_path).exists():
+            if not os.path.exists(self.db_path):
                 raise Exception(f"Wikipedia database not found: {self.db_path}")
             
-            self.search_engine = WikipediaSearchEngine(self.db_path)
-            self.context_extractor = WikipediaContextExtractor(self.search_engine)
+            try:
+                from wikipedia_search import WikipediaSearchEngine, WikipediaContextExtractor, WikipediaStats
+                from wikipedia_cache import default_search_cache_path
+            except ImportError:
+                raise Exception("Wikipedia search modules not found")
+            
+            self.search_engine = WikipediaSearchEngine(
+                self.db_path,
+                read_only=self.read_only,
+                coalesce=self.long_running,
+                cache_results=self.long_running,
+                persistent_cache_path=default_search_cache_path(self.db_path) if self.search_cache else None
+            )
+            self.context_extractor = WikipediaContextExtractor(self.search_engine, cache_contexts=self.long_running)
             self.stats = WikipediaStats(self.search_engine)
             
         except Exception as e:
             raise Exception(f"Failed to initialize Wikipedia API: {e}")
     
+    def handle(self, action, params):
+        """Route a bridge action to its handler"""
+        method = self.ACTIONS.get(action)
+        if method is None:
+            return {"error": f"Unknown action: {action}"}
+        
+        return getattr(self, method)(params)
+    
+    def batch(self, params):
+        """Run several actions on one connection inside one read transaction"""
+        try:
+            operations = params if isinstance(params, list) else params.get('operations', [])
+            
+            results = []
+            with self.search_engine.read_transaction():
+                for operation in operations:
+                    action = operation.get('action', '')
+                    if action == 'batch':
+                        results.append({"error": "Nested batch is not supported"})
+                        continue
+                    
+                    try:
+                        results.append(self.handle(action, operation.get('params') or {}))
+                    except Exception as e:
+                        results.append({"error": f"Action failed: {e}"})
+            
+            return {"results": results, "total": len(results)}
+            
+        except Exception as e:
+            return {"results": [], "error": str(e)}
+    
+    def stream(self, action, params):
+        """
+        Yield an action's response as NDJSON records: a header, then one
+        record per result as soon as it is produced, then a trailer with
+        totals and timings.
+        
+        A search's first min(limit, SPELLING_CORRECT_BELOW) results are the
+        exception: they are only sent once that many have been found. A query
+        that runs out before then is retried spell-corrected, and emitted
+        records cannot be taken back, so its first records arrive after the
+        whole query as typed has run. Records after those, later pages and
+        requests with "correct": false are not held back; the trailer reports
+        any corrections.
+        """
+        start_time = time.perf_counter()
+        yield {"type": "header", "action": action}
+        
+        summary = {"total": 0}
+        try:
+            method = self.STREAM_ACTIONS.get(action)
+            if method is None:
+                summary = yield from self.stream_whole(action, params)
+            else:
+                summary = yield from getattr(self, method)(params)
+        except Exception as e:
+            yield {"type": "error", "error": str(e)}
+        
+        yield {
+            "type": "trailer",
+            **summary,
+            "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1)
+        }
+    
+    def stream_whole(self, action, params):
+        """Stream an action that has no incremental form as a single record"""
+        yield {"type": "result", "result": self.handle(action, params)}
+        return {"total": 1}
+    
+    def stream_search(self, params):
+        """Stream search results as they are scored, after the first few; see stream()"""
+        query = params.get('query', '')
+        limit = params.get('limit', 5)
+        fields = self.get_fields(params, self.SEARCH_FIELDS)
+        ranking = self.get_ranking(params)
+        
+        if not query:
+            yield {"type": "error", "error": "Empty query"}
+            return {"total": 0}
+        
+        snippets = 'snippet' in fields
+        scope = [query.lower(), ranking]
+        cursor = self.decode_cursor(params, 'search', scope)
+        
+        head, next_after, exhausted = [], None, False
+        if cursor:
+            search_query, corrections = self.resume_corrections(query, cursor)
+            results = self.search_engine.iter_search(search_query, limit=limit, snippets=snippets,
+                                                     ranking=ranking, after=tuple(cursor['after']))
+        else:
+            search_query, corrections = query, {}
+            results = self.search_engine.iter_search(query, limit=limit, snippets=snippets, ranking=ranking)
+            
+            # Hold back the first few results: if the query as typed runs out
+            # before then, the spell-corrected query gets a chance
+            enough = min(limit, self.search_engine.SPELLING_CORRECT_BELOW) if params.get('correct', True) else 0
+            while len(head) < enough:
+                try:
+                    head.append(next(results))
+                except StopIteration as stop:
+                    search_query, corrections, (head, next_after) = self.correct_if_sparse(
+                        params, query, (head, stop.value),
+                        lambda corrected: self.search_engine.search_page(
+                            corrected, limit=limit, snippets=snippets, ranking=ranking
+                        ),
+                        lambda page: len(page[0]), enough
+                    )
+                    exhausted = True
+                    break
+        
+        total = 0
+        for result in head:
+            total += 1
+            yield {"type": "result", "result": self.result_to_dict(result, fields)}
+        
+        while not exhausted:
+            try:
+                result = next(results)
+            except StopIteration as stop:
+                next_after = stop.value
+                break
+            total += 1
+            yield {"type": "result", "result": self.result_to_dict(result, fields)}
+        
+        trailer = {"total": total, "query": query,
+                   "next_cursor": self.next_search_cursor(next_after, scope, bool(corrections))}
+        return self.with_corrections(trailer, search_query, corrections)
+    
+    def stream_context(self, params):
+        """Stream context sources, with the assembled context text in the trailer"""
+        query = params.get('query', '')
+        max_length = params.get('maxLength', 2000)
+        
+        if not query:
+            yield {"type": "error", "error": "Empty query"}
+            return {"total": 0}
+        
+        search_query, corrections, context_result = self.build_context(params, query, max_length)
+        
+        for source in context_result.sources:
+            yield {
+                "type": "result",
+                "result": {
+                    "id": source.id,
+                    "article_id": source.article_id,
+                    "title": source.title,
+                    "summary": source.summary,
+                    "relevance_score": source.relevance_score
+                }
+            }
+        
+        return self.with_corrections({
+            "total": context_result.total_articles,
+            "context": context_result.context_text,
+            "confidence": context_result.confidence_score,
+            "query": query
+        }, search_query, corrections)
+    
+    def stream_article(self, params):
+        """Stream an article by title, content in chunks"""
+        title = params.get('title', '')
+        
+        if not title:
+            yield {"type": "error", "error": "Missing title"}
+            return {"total": 0}
+        
+        return (yield from self.stream_article_content(self.search_engine.get_article_by_title(title)))
+    
+    def stream_article_by_id(self, params):
+        """Stream an article by ID, content in chunks"""
+        article_id = params.get('article_id', '')
+        
+        if not article_id:
+            yield {"type": "error", "error": "Missing article_id"}
+            return {"total": 0}
+        
+        return (yield from self.stream_article_content(self.search_engine.get_article_by_id(article_id)))
+    
+    def stream_article_content(self, article):
+        """Emit article metadata, then its content a chunk at a time"""
+        if not article:
+            yield {"type": "error", "error": "Article not found"}
+            return {"total": 0}
+        
+        yield {
+            "type": "result",
+            "result": {
+                "id": article.id,
+                "article_id": article.article_id,
+                "title": article.title,
+                "summary": article.summary,
+                "categories": article.categories,
+                "relevance_score": article.relevance_score
+            }
+        }
+        
+        content = article.content
+        for offset in range(0, len(content), self.STREAM_CHUNK_SIZE):
+            yield {"type": "content", "data": content[offset:offset + self.STREAM_CHUNK_SIZE]}
+        
+        return {"total": 1, "content_length": len(content)}
+    
+    def get_fields(self, params, default):
+        """Read the "fields" projection param, falling back to the action's default"""
+        fields = params.get('fields')
+        if fields is None:
+            return default
+        
+        unknown = [field for field in fields if field not in self.RESULT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        
+        return tuple(fields)
+    
+    def get_ranking(self, params):
+        """Read the "ranking" param for search actions"""
+        ranking = params.get('ranking', 'legacy')
+        if ranking not in self.search_engine.RANKING_MODES:
+            raise ValueError(f"Unknown ranking: {ranking}")
+        return ranking
+    
+    def encode_cursor(self, kind, scope, key):
+        """Opaque page token: the listing it belongs to and the key to resume after"""
+        import base64
+        payload = json.dumps({"kind": kind, "scope": scope, "key": key}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    def decode_cursor(self, params, kind, scope):
+        """Read the "cursor" param of a listing; returns its key, or None on the first page"""
+        token = params.get('cursor')
+        if not token:
+            return None
+        
+        import base64
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+        
+        if not isinstance(payload, dict) or payload.get('kind') != kind or payload.get('scope') != scope:
+            raise ValueError("Cursor does not belong to this listing")
+        return payload.get('key')
+    
+    def correct_if_sparse(self, params, query, outcome, search, count, enough):
+        """
+        Given the outcome of searching a query as typed, try the spell-corrected
+        query when that found fewer than `enough` results, keeping whichever
+        finds more. A word the index has never seen may well be a name, so a
+        query that already works is left alone. Returns (query searched,
+        corrections applied, outcome); "correct": false turns this off
+        """
+        if count(outcome) >= enough or not params.get('correct', True):
+            return query, {}, outcome
+        
+        corrected_query, corrections = self.search_engine.correct_query(query)
+        if corrections:
+            corrected = search(corrected_query)
+            if count(corrected) > count(outcome):
+                return corrected_query, corrections, corrected
+        
+        return query, {}, outcome
+    
+    def resume_corrections(self, query, cursor):
+        """Later search pages continue whichever query the first page settled on"""
+        if cursor['corrected']:
+            return self.search_engine.correct_query(query)
+        return query, {}
+    
+    def build_context(self, params, query, max_length):
+        """Context for a query, spell-corrected if it finds too few articles; returns (query, corrections, context)"""
+        def get_context(context_query):
+            return self.context_extractor.get_context_for_query(context_query, max_length=max_length)
+        
+        return self.correct_if_sparse(params, query, get_context(query), get_context,
+                                      lambda context: context.total_articles,
+                                      self.search_engine.SPELLING_CORRECT_BELOW)
+    
+    def with_corrections(self, response, search_query, corrections):
+        """Report spelling corrections, and the query actually searched, in a response"""
+        response["corrections"] = corrections
+        if corrections:
+            response["corrected_query"] = search_query
+        return response
+    
+    def next_search_cursor(self, next_after, scope, corrected):
+        """Cursor resuming a search after the last row it scanned, or None at the end of the ranking"""
+        if next_after is None:
+            return None
+        return self.encode_cursor('search', scope, {"after": list(next_after), "corrected": corrected})
+    
+    def result_to_dict(self, result, fields=SEARCH_FIELDS):
+        """Convert a SearchResult to a dict with the requested fields"""
+        return {field: getattr(result, field) for field in fields}
+    
     def search(self, params):
         """Search Wikipedia articles"""
         try:
             query = params.get('query', '')
             limit = params.get('limit', 5)
+            fields = self.get_fields(params, self.SEARCH_FIELDS)
+            ranking = self.get_ranking(params)
             
             if not query:
                 return {"results": [], "error": "Empty query"}
             
-            results = self.search_engine.search(query, limit=limit)
+            scope = [query.lower(), ranking]
+            cursor = self.decode_cursor(params, 'search', scope)
+            
+            def search_page(page_query, after=None):
+                return self.search_engine.search_page(page_query, limit=limit, snippets='snippet' in fields,
+                                                      ranking=ranking, after=after)
+            
+            if cursor:
+                search_query, corrections = self.resume_corrections(query, cursor)
+                results, next_after = search_page(search_query, tuple(cursor['after']))
+            else:
+                search_query, corrections, (results, next_after) = self.correct_if_sparse(
+                    params, query, search_page(query), search_page, lambda page: len(page[0]),
+                    min(limit, self.search_engine.SPELLING_CORRECT_BELOW)
+                )
             
             # Convert SearchResult objects to dictionaries
-            result_dicts = []
-            for result in results:
-                result_dict = {
-                    "id": result.id,
-                    "article_id": result.article_id,
-                    "title": result.title,
-                    "summary": result.summary,
-                    "snippet": result.snippet,
-                    "categories": result.categories,
-                    "relevance_score": result.relevance_score
-                }
-                result_dicts.append(result_dict)
+            result_dicts = [self.result_to_dict(result, fields) for result in results]
             
-            return {
+            return self.with_corrections({
                 "results": result_dicts,
                 "total": len(result_dicts),
-                "query": query
-            }
+                "query": query,
+                "next_cursor": self.next_search_cursor(next_after, scope, bool(corrections))
+            }, search_query, corrections)
             
         except Exception as e:
             return {"results": [], "error": str(e)}
@@ -86,9 +435,7 @@ class WikipediaAPI:
             if not query:
                 return {"context": "", "sources": [], "confidence": 0, "error": "Empty query"}
             
-            context_result = self.context_extractor.get_context_for_query(
-                query, max_length=max_length
-            )
+            search_query, corrections, context_result = self.build_context(params, query, max_length)
             
             # Convert sources to dictionaries
             sources = []
@@ -102,13 +449,13 @@ class WikipediaAPI:
                 }
                 sources.append(source_dict)
             
-            return {
+            return self.with_corrections({
                 "context": context_result.context_text,
                 "sources": sources,
                 "confidence": context_result.confidence_score,
                 "total_articles": context_result.total_articles,
                 "query": query
-            }
+            }, search_query, corrections)
             
         except Exception as e:
             return {"context": "", "sources": [], "confidence": 0, "error": str(e)}
@@ -173,22 +520,26 @@ class WikipediaAPI:
         """Get random Wikipedia articles"""
         try:
             count = params.get('count', 5)
+            weighted = params.get('weighted', False)
+            fields = self.get_fields(params, self.RANDOM_FIELDS)
             
-            articles = self.search_engine.get_random_articles(count)
-            
-            article_dicts = []
-            for article in articles:
-                article_dict = {
-                    "id": article.id,
-                    "article_id": article.article_id,
-                    "title": article.title,
-                    "summary": article.summary,
-                    "snippet": article.snippet,
-                    "categories": article.categories
-                }
-                article_dicts.append(article_dict)
+            # A random listing is a seeded stream of draws; the cursor holds
+            # the seed and the next page number, so any process can continue it
+            position = self.decode_cursor(params, 'random', bool(weighted))
+            if position is None:
+                import random
+                position = [random.getrandbits(32), 0]
+            seed, page = position
+            
+            articles = self.search_engine.get_random_articles(count, weighted=weighted, seed=f"{seed}:{page}")
+            
+            article_dicts = [self.result_to_dict(article, fields) for article in articles]
             
-            return {"articles": article_dicts, "count": len(article_dicts)}
+            return {
+                "articles": article_dicts,
+                "count": len(article_dicts),
+                "next_cursor": self.encode_cursor('random', bool(weighted), [seed, page + 1]) if articles else None
+            }
             
         except Exception as e:
             return {"articles": [], "error": str(e)}
@@ -198,24 +549,24 @@ class WikipediaAPI:
         try:
             category = params.get('category', '')
             limit = params.get('limit', 10)
+            offset = params.get('offset', 0)
+            fields = self.get_fields(params, self.CATEGORY_FIELDS)
             
             if not category:
                 return {"results": [], "error": "Missing category"}
             
-            results = self.search_engine.search_by_category(category, limit)
+            after = self.decode_cursor(params, 'category', category)
+            results = self.search_engine.search_by_category(category, limit, offset,
+                                                            after=tuple(after) if after else None)
             
-            result_dicts = []
-            for result in results:
-                result_dict = {
-                    "id": result.id,
-                    "article_id": result.article_id,
-                    "title": result.title,
-                    "summary": result.summary,
-                    "categories": result.categories
-                }
-                result_dicts.append(result_dict)
+            result_dicts = [self.result_to_dict(result, fields) for result in results]
+            
+            next_cursor = None
+            if results and len(results) == limit:
+                next_cursor = self.encode_cursor('category', category, [results[-1].title, results[-1].id])
             
-            return {"results": result_dicts, "category": category, "total": len(result_dicts)}
+            return {"results": result_dicts, "category": category, "total": len(result_dicts),
+                    "next_cursor": next_cursor}
             
         except Exception as e:
             return {"results": [], "error": str(e)}
@@ -236,79 +587,186 @@ class WikipediaAPI:
         except Exception as e:
             return {"categories": [], "error": str(e)}
     
+    def suggest(self, params):
+        """Suggest article titles for a typed prefix"""
+        try:
+            prefix = params.get('prefix', '')
+            limit = params.get('limit', 8)
+            
+            if not prefix.strip():
+                return {"suggestions": [], "prefix": prefix, "total": 0}
+            
+            suggestions = [
+                {"article_id": article_id, "title": title}
+                for article_id, title in self.search_engine.suggest_titles(prefix, limit)
+            ]
+            
+            return {"suggestions": suggestions, "prefix": prefix, "total": len(suggestions)}
+            
+        except Exception as e:
+            return {"suggestions": [], "error": str(e)}
+    
     def get_stats(self, params):
         """Get Wikipedia database statistics"""
         try:
-            db_stats = self.stats.get_database_stats()
-            
-            # Add some test queries for performance stats
-            test_queries = [
-                "artificial intelligence",
-                "climate change",
-                "World War II",
-                "quantum physics",
-                "democracy"
-            ]
+            # Long-running modes refresh a stale snapshot in the background
+            max_age = self.STATS_MAX_AGE_SECONDS if self.long_running else None
+            snapshot = self.stats.get_snapshot(max_age=max_age)
             
-            performance_stats = self.stats.get_search_performance_stats(test_queries)
+            cache_stats = self.search_engine.get_cache_stats()
+            cache_stats.update(self.context_extractor.get_cache_stats())
             
             return {
-                "database": db_stats,
-                "performance": performance_stats,
+                "database": snapshot['database'],
+                "performance": snapshot['performance'],
+                "cache": cache_stats,
+                "generated_at": snapshot['generated_at'],
+                "age_seconds": round(time.time() - snapshot['generated_at'], 1),
                 "status": "available"
             }
             
         except Exception as e:
             return {"error": str(e), "status": "error"}
 
+def response_writer(response_format='json', compress=False, output_stream=None):
+    """
+    Return a function that writes one response in the negotiated format:
+    a JSON line by default, or a length-prefixed binary message (see
+    wikipedia_frames) that passes article bodies through as raw UTF-8
+    """
+    if response_format == 'binary':
+        from wikipedia_frames import encode_message
+        output_stream = output_stream or sys.stdout.buffer
+        
+        def write(response):
+            output_stream.write(encode_message(response, compress=compress))
+            output_stream.flush()
+    else:
+        output_stream = output_stream or sys.stdout
+        
+        def write(response):
+            output_stream.write(json.dumps(response) + "\n")
+            output_stream.flush()
+    
+    return write
+
+def serve(wiki_api, input_stream=None, write=None):
+    """
+    Long-running bridge mode: read newline-delimited JSON requests and write
+    one response per request.
+
+    Each request looks like {"id": 1, "action": "search", "params": {...}} and
+    each response echoes the id: {"id": 1, "result": {...}}. Clients may write
+    several requests before reading, and match responses by id.
+    
+    Requests with "stream": true are answered with a sequence of NDJSON
+    records (header, results, trailer), each carrying the request id. See
+    WikipediaAPI.stream() for when result records are sent.
+    """
+    input_stream = input_stream or sys.stdin
+    write = write or response_writer()
+
+    for line in input_stream:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            action = request.get('action', '')
+            params = request.get('params') or {}
+            
+            if request.get('stream'):
+                for record in wiki_api.stream(action, params):
+                    write({"id": request_id, **record})
+                continue
+            
+            response = {"id": request_id, "result": wiki_api.handle(action, params)}
+        except json.JSONDecodeError:
+            response = {"id": request_id, "error": "Invalid JSON request"}
+        except Exception as e:
+            response = {"id": request_id, "error": f"Action failed: {e}"}
+
+        write(response)
+
 def main():
     """Main CLI interface"""
-    if len(sys.argv) < 3:
-        print(json.dumps({"error": "Usage: python3 wikipedia_api.py <action> <params_json>"}))
+    args = sys.argv[1:]
+    
+    # Opt-in NDJSON streaming output
+    stream = '--stream' in args
+    if stream:
+        args.remove('--stream')
+    
+    # Opt-in binary framing (--format binary), optionally compressed
+    compress = '--compress' in args
+    if compress:
+        args.remove('--compress')
+    
+    response_format = 'json'
+    if '--format' in args:
+        index = args.index('--format')
+        response_format = args[index + 1] if index + 1 < len(args) else ''
+        del args[index:index + 2]
+    
+    if response_format not in ('json', 'binary'):
+        print(json.dumps({"error": f"Unknown format: {response_format}"}))
+        sys.exit(1)
+    
+    # Opt-in search cache in a side file shared by one-process-per-call invocations
+    search_cache = '--search-cache' in args
+    if search_cache:
+        args.remove('--search-cache')
+    
+    write = response_writer(response_format, compress=compress)
+    
+    if len(args) >= 1 and args[0] == '--serve':
+        try:
+            wiki_api = WikipediaAPI(*args[1:2], long_running=True)
+        except Exception as e:
+            write({"error": f"Failed to initialize Wikipedia: {e}"})
+            sys.exit(1)
+
+        serve(wiki_api, write=write)
+        return
+
+    if len(args) < 2:
+        write({"error": "Usage: python3 wikipedia_api.py [--stream] [--format json|binary] [--compress] [--search-cache] <action> <params_json> [db_path] | --serve [db_path]"})
         sys.exit(1)
     
-    action = sys.argv[1]
+    action = args[0]
     
     try:
-        params = json.loads(sys.argv[2])
+        params = json.loads(args[1])
     except json.JSONDecodeError:
-        print(json.dumps({"error": "Invalid JSON parameters"}))
+        write({"error": "Invalid JSON parameters"})
         sys.exit(1)
     
+    if action not in WikipediaAPI.ACTIONS:
+        write({"error": f"Unknown action: {action}"})
+        return
+    
     # Initialize Wikipedia API
     try:
-        wiki_api = WikipediaAPI()
+        wiki_api = WikipediaAPI(*args[2:3], search_cache=search_cache)
     except Exception as e:
-        print(json.dumps({"error": f"Failed to initialize Wikipedia: {e}"}))
+        write({"error": f"Failed to initialize Wikipedia: {e}"})
         sys.exit(1)
     
     # Route to appropriate method
     try:
-        if action == 'search':
-            result = wiki_api.search(params)
-        elif action == 'context':
-            result = wiki_api.get_context(params)
-        elif action == 'article':
-            result = wiki_api.get_article_by_id(params)  # Keep existing behavior for 'article'
-        elif action == 'get_article':
-            result = wiki_api.get_article(params)  # New action for get by title
-        elif action == 'random':
-            result = wiki_api.get_random_articles(params)
-        elif action == 'category':
-            result = wiki_api.search_by_category(params)
-        elif action == 'categories':
-            result = wiki_api.get_categories(params)
-        elif action == 'stats':
-            result = wiki_api.get_stats(params)
-        else:
-            result = {"error": f"Unknown action: {action}"}
+        if stream:
+            for record in wiki_api.stream(action, params):
+                write(record)
+            return
         
-        print(json.dumps(result))
+        write(wiki_api.handle(action, params))
         
     except Exception as e:
-        print(json.dumps({"error": f"Action failed: {e}"}))
+        write({"error": f"Action failed: {e}"})
         sys.exit(1)
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Wikipedia Query Caching Primitives
+Request coalescing and caches shared by the long-running bridge modes
+"""
+
+import json
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+class _Call:
+    """One in-flight execution that other callers can wait on"""
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running wait for it and receive the same value (or exception).
+    Nothing is remembered once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run fn() once for all concurrent callers with this key
+
+        Returns:
+            (value, shared) where shared is True for callers that received
+            another caller's result and must not mutate it
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.value, False
+
+    def get_stats(self):
+        """Counters for the stats action"""
+        return {
+            'executions': self.executions,
+            'coalesced': self.coalesced
+        }
+
+class BoundedCache:
+    """
+    Thread-safe LRU cache bounded by entry count and approximate size in
+    bytes, with an optional TTL. Entries belong to a data version; switching
+    to a new version drops everything cached for the old one.
+
+    Values larger than max_entry_fraction of max_bytes are not admitted, so a
+    single huge value cannot flush everything else.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = None, max_entry_fraction: float = 1.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self.version = None
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejections = 0
+
+    def set_version(self, version):
+        """Drop all entries if the underlying data changed"""
+        with self._lock:
+            if version == self.version:
+                return
+            if self._entries:
+                self.invalidations += 1
+            self._reset()
+            self.version = version
+
+    def get(self, key):
+        """Return the cached value, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.total_bytes -= size
+                self.removed(key, value)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size: int) -> bool:
+        """Cache a value of approximately `size` bytes; returns False if it was not admitted"""
+        if size > self.max_entry_bytes:
+            with self._lock:
+                self.rejections += 1
+            return False
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+                self.removed(key, previous[0])
+
+            self._entries[key] = (value, size, expires_at)
+            self.total_bytes += size
+
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                evicted_key, (evicted_value, evicted_size, _) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.removed(evicted_key, evicted_value)
+                self.evictions += 1
+
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        """Drop every entry; called with the lock held"""
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def removed(self, key, value):
+        """Hook for subclasses, called with the lock held when an entry leaves the cache"""
+
+    def get_stats(self):
+        """Counters for the stats action"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'rejections': self.rejections
+            }
+
+class ArticleCache(BoundedCache):
+    """
+    Byte-bounded cache of decoded articles, keyed by article_id and
+    reachable by title through an alias table that follows evictions.
+    Aliases are the exact titles articles were requested by: title lookup
+    resolves case variants and redirects, and titles differing only in case
+    can name different articles, so one lookup's answer cannot stand in for
+    a differently spelled request.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._titles = {}   # requested title -> article_id
+        self._aliases = {}  # article_id -> requested titles
+
+    def get_by_id(self, article_id):
+        return self.get(article_id)
+
+    def get_by_title(self, title):
+        with self._lock:
+            article_id = self._titles.get(title)
+        if article_id is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return self.get(article_id)
+
+    def put_article(self, article, size: int, title: str = None) -> bool:
+        """Cache an article under its article_id, and under the title it was requested by"""
+        with self._lock:
+            cached = article.article_id in self._entries
+
+        # Re-putting a cached article would drop the aliases it already has
+        if not cached and not self.put(article.article_id, article, size):
+            return False
+        if title is None:
+            return True
+        with self._lock:
+            if article.article_id in self._entries:
+                previous = self._titles.get(title)
+                if previous is not None and previous != article.article_id:
+                    self._aliases[previous].discard(title)
+                self._titles[title] = article.article_id
+                self._aliases.setdefault(article.article_id, set()).add(title)
+        return True
+
+    def _reset(self):
+        super()._reset()
+        self._titles.clear()
+        self._aliases.clear()
+
+    def removed(self, key, value):
+        for title in self._aliases.pop(key, ()):
+            if self._titles.get(title) == key:
+                del self._titles[title]
+
+def default_search_cache_path(db_path: str) -> str:
+    """Side file that holds the persistent search cache for a database"""
+    return db_path + '.search-cache'
+
+class PersistentSearchCache:
+    """
+    Search results cached in a side SQLite file, shared by every bridge
+    process that opens the same database. Stores only article row ids,
+    scores, snippets and the next-page key; rows are re-read from the main database by primary
+    key. Entries are tagged with the database content version and purged
+    when it changes.
+
+    A one-row meta table records the content version the file was last
+    purged for and a running entry count kept by triggers, so neither a new
+    process nor a put has to scan the cache. Hits only refresh last_used
+    once it is touch_seconds old.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, touch_seconds: float = 60.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_seconds = touch_seconds
+        self._local = threading.local()
+        self._purged_version = None
+
+    @property
+    def conn(self):
+        """Connection owned by the calling thread, created on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript('''
+                BEGIN IMMEDIATE;
+                
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    content_version TEXT NOT NULL,
+                    results TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                
+                CREATE INDEX IF NOT EXISTS idx_search_cache_last_used ON search_cache(last_used);
+                
+                CREATE TABLE IF NOT EXISTS search_cache_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    content_version TEXT NOT NULL,
+                    entry_count INTEGER NOT NULL
+                );
+                
+                -- Files from before the meta table start with their current size
+                INSERT OR IGNORE INTO search_cache_meta (id, content_version, entry_count)
+                SELECT 0, '', COUNT(*) FROM search_cache;
+                
+                CREATE TRIGGER IF NOT EXISTS search_cache_insert AFTER INSERT ON search_cache
+                BEGIN
+                    UPDATE search_cache_meta SET entry_count = entry_count + 1 WHERE id = 0;
+                END;
+                
+                CREATE TRIGGER IF NOT EXISTS search_cache_delete AFTER DELETE ON search_cache
+                BEGIN
+                    UPDATE search_cache_meta SET entry_count = entry_count - 1 WHERE id = 0;
+                END;
+                
+                COMMIT;
+            ''')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, content_version: str):
+        """Return the cached page (a JSON value) for the key, or None"""
+        self.purge_stale(content_version)
+
+        row = self.conn.execute(
+            'SELECT results, last_used FROM search_cache WHERE cache_key = ? AND content_version = ?',
+            (key, content_version)
+        ).fetchone()
+        if row is None:
+            return None
+
+        # Eviction only needs a rough order; skip the write on most hits
+        now = time.time()
+        if now - row[1] >= self.touch_seconds:
+            self.conn.execute('UPDATE search_cache SET last_used = ? WHERE cache_key = ?', (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, content_version: str, entries):
+        """Store a page (a JSON value) for the key, evicting least recently used entries"""
+        self.purge_stale(content_version)
+
+        with self.transaction() as conn:
+            # An upsert, unlike INSERT OR REPLACE, leaves the insert trigger
+            # and so the entry count alone when the key already exists
+            conn.execute('''
+                INSERT INTO search_cache (cache_key, content_version, results, last_used)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (cache_key) DO UPDATE SET
+                    content_version = excluded.content_version,
+                    results = excluded.results,
+                    last_used = excluded.last_used
+            ''', (key, content_version, json.dumps(entries), time.time()))
+
+            entry_count = conn.execute('SELECT entry_count FROM search_cache_meta WHERE id = 0').fetchone()[0]
+            overflow = entry_count - self.max_entries
+            if overflow > 0:
+                conn.execute('''
+                    DELETE FROM search_cache WHERE cache_key IN (
+                        SELECT cache_key FROM search_cache ORDER BY last_used LIMIT ?
+                    )
+                ''', (overflow,))
+
+    def purge_stale(self, content_version: str):
+        """Drop entries cached against any other database version, once per version change"""
+        if content_version == self._purged_version:
+            return
+
+        with self.transaction() as conn:
+            stored = conn.execute('SELECT content_version FROM search_cache_meta WHERE id = 0').fetchone()[0]
+            if stored != content_version:
+                conn.execute('DELETE FROM search_cache WHERE content_version != ?', (content_version,))
+                conn.execute('UPDATE search_cache_meta SET content_version = ? WHERE id = 0', (content_version,))
+        self._purged_version = content_version
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction on this thread's connection, taken up front so concurrent writers queue"""
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
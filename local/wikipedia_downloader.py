@@ -19,10 +19,15 @@ from datetime import datetime
 import logging
 from pathlib import Path
 
+from wikipedia_search import WikipediaSearchEngine, normalize_title, delete_variants
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Bump when the database layout changes; readers find it in wikipedia_metadata
+SCHEMA_VERSION = 10
+
 class WikipediaDownloader:
     """Download and process Wikipedia dumps for offline use"""
     
@@ -115,6 +120,12 @@ class WikipediaDownloader:
             
             # Create search indexes
             db.create_search_index()
+            db.rebuild_article_weights()
+            db.rebuild_title_prefixes()
+            db.rebuild_title_trigrams()
+            db.rebuild_vocabulary()
+            db.update_metadata()
+            db.update_stats_snapshot()
             
             logger.info("Wikipedia processing completed successfully")
             return db_path
@@ -161,7 +172,10 @@ class WikipediaXMLProcessor:
                 #logger.info(current_element)
                 if current_element == 'page':
                     # Process complete page
-                    if self.is_valid_article(current_page):
+                    redirect_target = self.get_redirect_target(current_page)
+                    if redirect_target:
+                        self.db.insert_redirect(current_page.get('title', '').strip(), redirect_target)
+                    elif self.is_valid_article(current_page):
                         self.process_article(current_page)
                         self.articles_processed += 1
                         
@@ -171,11 +185,32 @@ class WikipediaXMLProcessor:
                     current_page = {}
                     root.clear()  # Free memory
                     
-                elif current_element in ['title', 'text', 'id']:
+                elif current_element in ['title', 'text']:
                     current_page[current_element] = elem.text or ''
+                
+                elif current_element == 'id':
+                    # The page id comes first; revision and contributor ids
+                    # follow it and are shared between pages
+                    current_page.setdefault('id', elem.text or '')
+                
+                elif current_element == 'redirect':
+                    current_page['redirect'] = elem.get('title', '')
 
                 current_element = None
     
+    def get_redirect_target(self, page):
+        """Return the target title of a main-namespace redirect page, or None"""
+        title = page.get('title', '')
+        if not title or title.startswith(('Category:', 'Template:', 'File:', 'Wikipedia:')):
+            return None
+        
+        target = page.get('redirect')
+        if not target:
+            match = re.match(r'\s*#REDIRECT\s*\[\[([^\]|#]+)', page.get('text', ''), re.IGNORECASE)
+            target = match.group(1) if match else None
+        
+        return target.strip() if target else None
+    
     def is_valid_article(self, page):
         """Check if page is a valid article"""
         title = page.get('title', '')
@@ -263,17 +298,19 @@ class WikipediaDatabase:
         self.conn.execute('PRAGMA synchronous=NORMAL')
         self.conn.execute('PRAGMA cache_size=10000')
         
-        # Create tables
+        # Create tables. content is the last column so that reading the small
+        # columns of a row never has to walk the overflow pages of its text
         self.conn.executescript('''
             CREATE TABLE IF NOT EXISTS wikipedia_articles (
                 id INTEGER PRIMARY KEY,
                 article_id TEXT UNIQUE,
                 title TEXT NOT NULL,
-                content TEXT NOT NULL,
                 summary TEXT,
                 categories TEXT,
                 word_count INTEGER,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                title_key TEXT,
+                content TEXT NOT NULL
             );
             
             CREATE TABLE IF NOT EXISTS wikipedia_metadata (
@@ -285,17 +322,386 @@ class WikipediaDatabase:
             CREATE INDEX IF NOT EXISTS idx_article_id ON wikipedia_articles(article_id);
         ''')
         
+        self.create_title_keys()
+        self.create_category_counts()
+        self.create_article_categories()
+        
+        self.conn.commit()
+    
+    def table_exists(self, name):
+        """Check whether a table is present in the database"""
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)
+        ).fetchone() is not None
+    
+    def create_title_keys(self):
+        """
+        Add the normalized title_key column, its index and the redirects
+        table, backfilling keys for databases built before them
+        """
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(wikipedia_articles)')]
+        if 'title_key' not in columns:
+            self.conn.execute('ALTER TABLE wikipedia_articles ADD COLUMN title_key TEXT')
+            self.rebuild_title_keys()
+        
+        self.conn.executescript('''
+            CREATE INDEX IF NOT EXISTS idx_title_key ON wikipedia_articles(title_key);
+            
+            CREATE TABLE IF NOT EXISTS redirects (
+                title_key TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                target_key TEXT NOT NULL
+            ) WITHOUT ROWID;
+        ''')
+    
+    def rebuild_title_keys(self):
+        """Recompute title_key for every article"""
+        self.conn.create_function('normalize_title', 1, normalize_title, deterministic=True)
+        self.conn.execute('UPDATE wikipedia_articles SET title_key = normalize_title(title)')
+        self.conn.commit()
+    
+    def insert_redirect(self, title, target):
+        """Record a redirect from an alias title to its target article's title"""
+        self.conn.execute('''
+            INSERT OR REPLACE INTO redirects (title_key, title, target_key) VALUES (?, ?, ?)
+        ''', (normalize_title(title), title, normalize_title(target)))
+    
+    def create_category_counts(self):
+        """Create the category_counts table and the triggers that keep it current"""
+        is_new = not self.table_exists('category_counts')
+        
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS category_counts (
+                category TEXT PRIMARY KEY,
+                article_count INTEGER NOT NULL
+            );
+            
+            CREATE INDEX IF NOT EXISTS idx_category_counts_count
+                ON category_counts(article_count DESC, category);
+            
+            CREATE TRIGGER IF NOT EXISTS category_counts_insert
+            AFTER INSERT ON wikipedia_articles
+            WHEN json_valid(NEW.categories)
+            BEGIN
+                INSERT INTO category_counts (category, article_count)
+                SELECT value, 1 FROM json_each(NEW.categories) WHERE true
+                ON CONFLICT(category) DO UPDATE SET article_count = article_count + 1;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS category_counts_delete
+            AFTER DELETE ON wikipedia_articles
+            WHEN json_valid(OLD.categories)
+            BEGIN
+                UPDATE category_counts
+                SET article_count = article_count - (
+                    SELECT COUNT(*) FROM json_each(OLD.categories) WHERE value = category
+                )
+                WHERE category IN (SELECT value FROM json_each(OLD.categories));
+                
+                DELETE FROM category_counts WHERE article_count <= 0;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS category_counts_update
+            AFTER UPDATE OF categories ON wikipedia_articles
+            BEGIN
+                UPDATE category_counts
+                SET article_count = article_count - (
+                    SELECT COUNT(*) FROM json_each(OLD.categories) WHERE value = category
+                )
+                WHERE json_valid(OLD.categories)
+                  AND category IN (SELECT value FROM json_each(OLD.categories));
+                
+                DELETE FROM category_counts WHERE article_count <= 0;
+                
+                INSERT INTO category_counts (category, article_count)
+                SELECT value, 1 FROM json_each(NEW.categories) WHERE json_valid(NEW.categories)
+                ON CONFLICT(category) DO UPDATE SET article_count = article_count + 1;
+            END;
+        ''')
+        
+        # Articles ingested before the triggers existed
+        if is_new:
+            self.rebuild_category_counts()
+    
+    def rebuild_category_counts(self):
+        """Recount every category from scratch"""
+        self.conn.execute('DELETE FROM category_counts')
+        self.conn.execute('''
+            INSERT INTO category_counts (category, article_count)
+            SELECT value, COUNT(*)
+            FROM wikipedia_articles, json_each(wikipedia_articles.categories)
+            WHERE json_valid(wikipedia_articles.categories)
+            GROUP BY value
+        ''')
+        self.conn.commit()
+    
+    def create_article_categories(self):
+        """
+        Create the category dictionary and the article_categories join table,
+        clustered by (category_id, title) so a category lists in title order
+        straight off the primary key, plus the triggers that keep them current
+        """
+        is_new = not self.table_exists('article_categories')
+        
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS category_names (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE COLLATE NOCASE
+            );
+            
+            CREATE TABLE IF NOT EXISTS article_categories (
+                category_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                article_rowid INTEGER NOT NULL,
+                PRIMARY KEY (category_id, title, article_rowid)
+            ) WITHOUT ROWID;
+            
+            -- Trigger inserts use ON CONFLICT DO NOTHING rather than OR IGNORE:
+            -- an OR clause in a trigger is overridden by the conflict policy of
+            -- the statement that fired it, such as insert_article's upsert.
+            -- Databases built with the OR IGNORE versions get them replaced
+            DROP TRIGGER IF EXISTS article_categories_insert;
+            DROP TRIGGER IF EXISTS article_categories_update;
+            
+            CREATE TRIGGER article_categories_insert
+            AFTER INSERT ON wikipedia_articles
+            WHEN json_valid(NEW.categories)
+            BEGIN
+                INSERT INTO category_names (name)
+                SELECT value FROM json_each(NEW.categories) WHERE true
+                ON CONFLICT DO NOTHING;
+                
+                INSERT INTO article_categories (category_id, title, article_rowid)
+                SELECT c.id, NEW.title, NEW.id
+                FROM json_each(NEW.categories) j
+                JOIN category_names c ON c.name = j.value
+                WHERE true
+                ON CONFLICT DO NOTHING;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS article_categories_delete
+            AFTER DELETE ON wikipedia_articles
+            WHEN json_valid(OLD.categories)
+            BEGIN
+                DELETE FROM article_categories
+                WHERE title = OLD.title AND article_rowid = OLD.id
+                  AND category_id IN (
+                      SELECT c.id FROM json_each(OLD.categories) j
+                      JOIN category_names c ON c.name = j.value
+                  );
+            END;
+            
+            CREATE TRIGGER article_categories_update
+            AFTER UPDATE OF title, categories ON wikipedia_articles
+            BEGIN
+                DELETE FROM article_categories
+                WHERE json_valid(OLD.categories)
+                  AND title = OLD.title AND article_rowid = OLD.id
+                  AND category_id IN (
+                      SELECT c.id FROM json_each(OLD.categories) j
+                      JOIN category_names c ON c.name = j.value
+                  );
+                
+                INSERT INTO category_names (name)
+                SELECT value FROM json_each(NEW.categories) WHERE json_valid(NEW.categories)
+                ON CONFLICT DO NOTHING;
+                
+                INSERT INTO article_categories (category_id, title, article_rowid)
+                SELECT c.id, NEW.title, NEW.id
+                FROM json_each(NEW.categories) j
+                JOIN category_names c ON c.name = j.value
+                WHERE json_valid(NEW.categories)
+                ON CONFLICT DO NOTHING;
+            END;
+        ''')
+        
+        # Articles ingested before the triggers existed
+        if is_new:
+            self.rebuild_article_categories()
+    
+    def rebuild_article_categories(self):
+        """Rebuild the category dictionary and join table from scratch"""
+        self.conn.execute('DELETE FROM article_categories')
+        self.conn.execute('DELETE FROM category_names')
+        self.conn.execute('''
+            INSERT OR IGNORE INTO category_names (name)
+            SELECT value
+            FROM wikipedia_articles, json_each(wikipedia_articles.categories)
+            WHERE json_valid(wikipedia_articles.categories)
+        ''')
+        self.conn.execute('''
+            INSERT OR IGNORE INTO article_categories (category_id, title, article_rowid)
+            SELECT c.id, a.title, a.id
+            FROM wikipedia_articles a, json_each(a.categories) j
+            JOIN category_names c ON c.name = j.value
+            WHERE json_valid(a.categories)
+        ''')
+        self.conn.commit()
+    
+    def rebuild_title_prefixes(self, scan_limit=WikipediaSearchEngine.SUGGEST_SCAN_LIMIT,
+                               top_k=WikipediaSearchEngine.SUGGEST_TOP_K):
+        """
+        Precompute the top_k titles, best first by word count, for every
+        title_key prefix shared by more than scan_limit titles, so typeahead
+        never has to rank a larger key range than that. Prefixes are extended
+        a character at a time; only the extensions of a crowded prefix can be
+        crowded, so each pass only ranks the titles under the previous pass's
+        crowded prefixes
+        """
+        self.conn.executescript('''
+            DROP TABLE IF EXISTS title_prefixes;
+            
+            CREATE TABLE title_prefixes (
+                prefix TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                article_rowid INTEGER NOT NULL,
+                PRIMARY KEY (prefix, rank)
+            ) WITHOUT ROWID;
+        ''')
+        
+        length = 1
+        while True:
+            inserted = self.conn.execute('''
+                INSERT INTO title_prefixes (prefix, rank, article_rowid)
+                SELECT prefix, rank, id FROM (
+                    SELECT substr(title_key, 1, :length) AS prefix, id,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY substr(title_key, 1, :length)
+                            ORDER BY word_count DESC, title
+                        ) AS rank,
+                        COUNT(*) OVER (PARTITION BY substr(title_key, 1, :length)) AS total
+                    FROM wikipedia_articles
+                    WHERE length(title_key) >= :length
+                      AND (:length = 1 OR substr(title_key, 1, :length - 1) IN (
+                          SELECT prefix FROM title_prefixes WHERE rank = 1 AND length(prefix) = :length - 1
+                      ))
+                )
+                WHERE rank <= :top_k AND total > :scan_limit
+            ''', {'length': length, 'top_k': top_k, 'scan_limit': scan_limit}).rowcount
+            if not inserted:
+                break
+            length += 1
+        
+        self.conn.commit()
+        
+        logger.info(f"Built title prefixes up to {length - 1} characters")
+    
+    def rebuild_title_trigrams(self):
+        """
+        Rebuild the trigram index over title keys that the search engine
+        falls back to for misspelled queries. It reads titles from
+        wikipedia_articles, so it only needs rebuilding after ingest.
+        """
+        try:
+            self.conn.executescript('''
+                DROP TABLE IF EXISTS title_trigrams;
+                
+                CREATE VIRTUAL TABLE title_trigrams USING fts5(
+                    title_key,
+                    tokenize='trigram',
+                    content='wikipedia_articles',
+                    content_rowid='id'
+                );
+                
+                INSERT INTO title_trigrams (title_trigrams) VALUES ('rebuild');
+            ''')
+        except sqlite3.OperationalError as e:
+            # The trigram tokenizer needs SQLite 3.34 or later
+            logger.warning(f"Skipped title trigram index: {e}")
+            return
+        self.conn.commit()
+    
+    def rebuild_vocabulary(self, min_count=WikipediaSearchEngine.SPELLING_MIN_COUNT,
+                           index_terms=WikipediaSearchEngine.SPELLING_INDEX_TERMS,
+                           max_distance=WikipediaSearchEngine.SPELLING_MAX_DISTANCE,
+                           min_length=WikipediaSearchEngine.SPELLING_MIN_WORD_LENGTH):
+        """
+        Rebuild the corpus vocabulary with term frequencies, read from the
+        full-text index, and the symmetric-delete table for spelling
+        correction: every variant of a term seen at least min_count times with
+        up to max_distance characters deleted, mapped back to the term. The
+        vocabulary keeps every term, so rare words are still known words
+        """
+        if not self.table_exists('wikipedia_fts'):
+            logger.warning("Skipped vocabulary: no full-text index to read terms from")
+            return
+        
+        self.conn.executescript('''
+            DROP TABLE IF EXISTS spelling_deletes;
+            DROP TABLE IF EXISTS vocabulary;
+            
+            CREATE TABLE vocabulary (
+                term TEXT PRIMARY KEY,
+                frequency INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            
+            CREATE TABLE spelling_deletes (
+                variant TEXT NOT NULL,
+                term TEXT NOT NULL,
+                PRIMARY KEY (variant, term)
+            ) WITHOUT ROWID;
+            
+            CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts_terms USING fts5vocab(main, wikipedia_fts, row);
+        ''')
+        
+        self.conn.execute('''
+            INSERT INTO vocabulary (term, frequency)
+            SELECT term, cnt FROM temp.fts_terms
+        ''')
+        
+        frequent = [term for (term,) in self.conn.execute('''
+            SELECT term FROM vocabulary WHERE frequency >= ? AND length(term) >= ?
+            ORDER BY frequency DESC, term
+        ''', (min_count, min_length)) if term.isalpha()][:index_terms]
+        
+        self.conn.executemany('''
+            INSERT INTO spelling_deletes (variant, term) VALUES (?, ?)
+        ''', ((variant, term) for term in frequent for variant in delete_variants(term, max_distance)))
+        
+        self.conn.execute('DROP TABLE temp.fts_terms')
+        self.conn.commit()
+        
+        logger.info(f"Built vocabulary; {len(frequent):,} terms indexed for spelling correction")
+    
+    def rebuild_article_weights(self):
+        """
+        Rebuild the cumulative weight table used for weighted random sampling.
+        There is no pageview data in the dumps, so article length stands in
+        as the weight; a random point in [0, total) maps to an article with
+        one primary key seek.
+        """
+        self.conn.executescript('''
+            DROP TABLE IF EXISTS article_weights;
+            
+            CREATE TABLE article_weights (
+                cumulative INTEGER PRIMARY KEY,
+                article_rowid INTEGER NOT NULL
+            );
+            
+            INSERT INTO article_weights (cumulative, article_rowid)
+            SELECT SUM(max(coalesce(word_count, 0), 1)) OVER (ORDER BY id), id
+            FROM wikipedia_articles;
+        ''')
         self.conn.commit()
     
     def insert_article(self, article_id, title, content, summary, categories):
         """Insert article into database"""
         word_count = len(content.split())
         
+        # Update in place rather than INSERT OR REPLACE: REPLACE deletes the old
+        # row without firing delete triggers, which would skew category_counts
         self.conn.execute('''
-            INSERT OR REPLACE INTO wikipedia_articles 
-            (article_id, title, content, summary, categories, word_count)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (article_id, title, content, summary, categories, word_count))
+            INSERT INTO wikipedia_articles 
+            (article_id, title, title_key, content, summary, categories, word_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(article_id) DO UPDATE SET
+                title = excluded.title,
+                title_key = excluded.title_key,
+                content = excluded.content,
+                summary = excluded.summary,
+                categories = excluded.categories,
+                word_count = excluded.word_count
+        ''', (article_id, title, normalize_title(title), content, summary, categories, word_count))
         
         # Commit every 1000 articles
         if self.conn.total_changes % 1000 == 0:
@@ -305,6 +711,58 @@ class WikipediaDatabase:
         """Skip FTS index creation - using direct table queries"""
         logger.info("Database ready (no FTS index - using direct queries)")
     
+    def update_metadata(self):
+        """Record article count and schema version so readers never scan for them"""
+        article_count = self.conn.execute('SELECT COUNT(*) FROM wikipedia_articles').fetchone()[0]
+        
+        metadata = {
+            'schema_version': str(SCHEMA_VERSION),
+            'article_count': str(article_count),
+            'content_version': datetime.now().isoformat(),
+        }
+        
+        self.conn.executemany('''
+            INSERT OR REPLACE INTO wikipedia_metadata (key, value) VALUES (?, ?)
+        ''', metadata.items())
+        self.conn.commit()
+        
+        # Cached search results refer to the old content; readers would also
+        # purge them on the version change, but the file may be large
+        self.remove_search_cache()
+        
+        logger.info(f"Recorded metadata: {article_count:,} articles, schema version {SCHEMA_VERSION}")
+    
+    def update_stats_snapshot(self):
+        """Store a stats snapshot so the stats action never has to benchmark live"""
+        try:
+            from wikipedia_search import WikipediaSearchEngine, WikipediaStats
+            
+            engine = WikipediaSearchEngine(self.db_path)
+            try:
+                snapshot = WikipediaStats(engine).build_snapshot()
+            finally:
+                engine.close()
+        except Exception as e:
+            # The search index may not have been built yet
+            logger.warning(f"Skipped stats snapshot: {e}")
+            return
+        
+        self.conn.execute('''
+            INSERT OR REPLACE INTO wikipedia_metadata (key, value) VALUES (?, ?)
+        ''', ('stats_snapshot', json.dumps(snapshot)))
+        self.conn.commit()
+        
+        logger.info("Recorded stats snapshot")
+    
+    def remove_search_cache(self):
+        """Delete the persistent search cache side file, if any"""
+        from wikipedia_cache import default_search_cache_path
+        
+        cache_path = default_search_cache_path(self.db_path)
+        for path in (cache_path, cache_path + '-wal', cache_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+    
     def get_stats(self):
         """Get database statistics"""
         cursor = self.conn.execute('''
@@ -326,7 +784,7 @@ class WikipediaDatabase:
 def main():
     """Main CLI interface"""
     parser = argparse.ArgumentParser(description='Wikipedia Download and Processing Tool')
-    parser.add_argument('--action', choices=['list', 'download', 'process'], required=True,
+    parser.add_argument('--action', choices=['list', 'download', 'process', 'maintain'], required=True,
                        help='Action to perform')
     parser.add_argument('--dataset', choices=['simple', 'featured', 'full'],
                        help='Dataset to download/process')
@@ -337,6 +795,27 @@ def main():
     
     args = parser.parse_args()
     
+    if args.action == 'maintain':
+        # Refresh derived data for an existing database
+        if not Path(args.db_path).exists():
+            print(f"Error: {args.db_path} not found")
+            sys.exit(1)
+        
+        db = WikipediaDatabase(args.db_path)
+        db.initialize()
+        db.rebuild_title_keys()
+        db.rebuild_category_counts()
+        db.rebuild_article_categories()
+        db.rebuild_article_weights()
+        db.rebuild_title_prefixes()
+        db.rebuild_title_trigrams()
+        db.rebuild_vocabulary()
+        db.update_metadata()
+        db.update_stats_snapshot()
+        db.close()
+        print(f"Maintenance completed: {args.db_path}")
+        return
+    
     downloader = WikipediaDownloader(args.data_dir)
     
     if args.action == 'list':
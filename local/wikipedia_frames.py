@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Binary Framing for Wikipedia API Bridge Responses
+Length-prefixed frames that carry large text fields as raw UTF-8 instead of
+JSON-escaped strings, with optional per-frame zlib compression
+
+A message is a sequence of frames, each with a 6-byte header:
+
+    type (1 byte) | flags (1 byte) | payload length (4 bytes, big-endian)
+
+    J  JSON document; large strings are replaced by {"$body": <index>}
+    B  raw UTF-8 body, referenced by index in order of appearance
+    E  end of message (empty payload)
+
+Flag bit 0 marks a zlib-compressed payload.
+"""
+
+import json
+import zlib
+import struct
+
+FRAME_HEADER = struct.Struct('>cBI')
+
+FRAME_JSON = b'J'
+FRAME_BODY = b'B'
+FRAME_END = b'E'
+
+FLAG_COMPRESSED = 0x01
+
+# Strings at least this long are moved out of the JSON document into body frames
+BODY_THRESHOLD = 4096
+
+# Payloads smaller than this are never worth compressing
+COMPRESS_THRESHOLD = 1024
+
+def encode_message(response, compress: bool = False) -> bytes:
+    """Encode a bridge response as one framed message"""
+    bodies = []
+
+    def extract(value):
+        if isinstance(value, str) and len(value) >= BODY_THRESHOLD:
+            bodies.append(value)
+            return {"$body": len(bodies) - 1}
+        if isinstance(value, dict):
+            return {key: extract(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [extract(item) for item in value]
+        return value
+
+    document = json.dumps(extract(response)).encode('utf-8')
+
+    frames = [encode_frame(FRAME_JSON, document, compress)]
+    frames.extend(encode_frame(FRAME_BODY, body.encode('utf-8'), compress) for body in bodies)
+    frames.append(encode_frame(FRAME_END, b'', False))
+    return b''.join(frames)
+
+def encode_frame(frame_type: bytes, payload: bytes, compress: bool) -> bytes:
+    """Encode a single frame, compressing the payload when it pays off"""
+    flags = 0
+    if compress and len(payload) >= COMPRESS_THRESHOLD:
+        compressed = zlib.compress(payload, 6)
+        if len(compressed) < len(payload):
+            payload = compressed
+            flags |= FLAG_COMPRESSED
+
+    return FRAME_HEADER.pack(frame_type, flags, len(payload)) + payload
+
+def read_message(stream):
+    """Read one framed message from a binary stream; returns None at end of stream"""
+    document = None
+    bodies = []
+
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if not header:
+            return None
+        if len(header) < FRAME_HEADER.size:
+            raise ValueError("Truncated frame header")
+
+        frame_type, flags, length = FRAME_HEADER.unpack(header)
+        payload = stream.read(length)
+        if len(payload) < length:
+            raise ValueError("Truncated frame payload")
+        if flags & FLAG_COMPRESSED:
+            payload = zlib.decompress(payload)
+
+        if frame_type == FRAME_JSON:
+            document = json.loads(payload)
+        elif frame_type == FRAME_BODY:
+            bodies.append(payload.decode('utf-8'))
+        elif frame_type == FRAME_END:
+            break
+        else:
+            raise ValueError(f"Unknown frame type: {frame_type!r}")
+
+    def restore(value):
+        if isinstance(value, dict):
+            if len(value) == 1 and '$body' in value:
+                return bodies[value['$body']]
+            return {key: restore(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [restore(item) for item in value]
+        return value
+
+    return restore(document)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Wikipedia API Server
+Serves WikipediaAPI actions over a Unix domain socket or localhost HTTP,
+dispatching requests to a pool of worker threads
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+import socketserver
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from wikipedia_api import WikipediaAPI
+
+logger = logging.getLogger(__name__)
+
+class WikipediaWorkerPool:
+    """Runs WikipediaAPI actions on worker threads, one read-only connection per worker"""
+
+    def __init__(self, wiki_api: WikipediaAPI, workers: int = 4):
+        self.wiki_api = wiki_api
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='wikipedia-worker',
+            initializer=self._open_worker_connection
+        )
+
+    def _open_worker_connection(self):
+        """Open the worker thread's connection up front"""
+        self.wiki_api.search_engine.conn
+
+    def submit(self, action: str, params: dict):
+        """Queue an action and return its future"""
+        return self.executor.submit(self.wiki_api.handle, action, params)
+
+    def submit_stream(self, action: str, params: dict, emit):
+        """Queue a streaming action; emit is called with each record as it is produced"""
+        return self.executor.submit(self._run_stream, action, params, emit)
+
+    def _run_stream(self, action, params, emit):
+        for record in self.wiki_api.stream(action, params):
+            emit(record)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+class UnixSocketHandler(socketserver.StreamRequestHandler):
+    """
+    Newline-delimited JSON over a Unix socket, same framing as
+    `wikipedia_api.py --serve` (including "stream": true requests). Requests
+    on one connection run concurrently and responses are written as they
+    complete, matched by id.
+    """
+
+    def handle(self):
+        write_lock = threading.Lock()
+
+        def respond(response):
+            with write_lock:
+                try:
+                    self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+                    self.wfile.flush()
+                except OSError:
+                    pass  # Client went away
+
+        answered = []
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                respond({"id": None, "error": "Invalid JSON request"})
+                continue
+
+            request_id = request.get('id')
+            action = request.get('action', '')
+            params = request.get('params') or {}
+
+            done = threading.Event()
+            answered.append(done)
+
+            if request.get('stream'):
+                def on_done(future, request_id=request_id, done=done):
+                    if future.exception() is not None:
+                        respond(build_response(request_id, future))
+                    done.set()
+
+                future = self.server.pool.submit_stream(
+                    action, params,
+                    lambda record, request_id=request_id: respond({"id": request_id, **record})
+                )
+            else:
+                def on_done(future, request_id=request_id, done=done):
+                    respond(build_response(request_id, future))
+                    done.set()
+
+                future = self.server.pool.submit(action, params)
+
+            future.add_done_callback(on_done)
+
+        # Keep the connection open until every queued request has answered
+        for done in answered:
+            done.wait()
+
+class WikipediaUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, pool):
+        self.pool = pool
+        super().__init__(socket_path, UnixSocketHandler)
+
+class HTTPHandler(BaseHTTPRequestHandler):
+    """POST /<action> with JSON params, or GET /<action>?params=<json>"""
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b'{}'
+        self.dispatch(body)
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        self.dispatch(query.get('params', ['{}'])[0])
+
+    def dispatch(self, body):
+        action = urlsplit(self.path).path.strip('/')
+
+        try:
+            params = json.loads(body or '{}')
+        except json.JSONDecodeError:
+            self.send_json(400, {"error": "Invalid JSON parameters"})
+            return
+
+        future = self.server.pool.submit(action, params)
+        response = build_response(None, future)
+        if 'error' in response:
+            self.send_json(500, {"error": response['error']})
+        else:
+            self.send_json(200, response['result'])
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+class WikipediaHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pool):
+        self.pool = pool
+        super().__init__(address, HTTPHandler)
+
+def build_response(request_id, future):
+    """Turn a finished action future into a bridge response"""
+    try:
+        return {"id": request_id, "result": future.result()}
+    except Exception as e:
+        return {"id": request_id, "error": f"Action failed: {e}"}
+
+def main():
+    """Main CLI interface"""
+    parser = argparse.ArgumentParser(description='Wikipedia API Server')
+    listen = parser.add_mutually_exclusive_group(required=True)
+    listen.add_argument('--socket', help='Unix domain socket path to listen on')
+    listen.add_argument('--port', type=int, help='Localhost HTTP port to listen on')
+    parser.add_argument('--db-path', default='./wikipedia.db',
+                       help='SQLite database path')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                       help='Number of worker threads')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)  # Reduce log noise
+
+    try:
+        wiki_api = WikipediaAPI(args.db_path, read_only=True, long_running=True)
+    except Exception as e:
+        print(json.dumps({"error": f"Failed to initialize Wikipedia: {e}"}))
+        sys.exit(1)
+
+    pool = WikipediaWorkerPool(wiki_api, workers=args.workers)
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        server = WikipediaUnixServer(args.socket, pool)
+        logger.info(f"Wikipedia server listening on {args.socket}")
+    else:
+        server = WikipediaHTTPServer(('127.0.0.1', args.port), pool)
+        logger.info(f"Wikipedia server listening on http://127.0.0.1:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+if __name__ == '__main__':
+    main()
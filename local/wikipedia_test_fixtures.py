@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures for the Wikipedia bridge tests
+Builds small throwaway databases through the same ingest path as the downloader
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from wikipedia_downloader import WikipediaDatabase
+
+def build_database(db_path, articles, vocabulary=False):
+    """
+    Ingest (article_id, title, content, summary, categories) tuples into a new
+    database, then add the full-text index and, optionally, the spelling
+    vocabulary
+    """
+    db = WikipediaDatabase(db_path)
+    db.initialize()
+
+    for article_id, title, content, summary, categories in articles:
+        db.insert_article(article_id, title, content, summary, json.dumps(categories))
+
+    build_search_index(db)
+    if vocabulary:
+        db.rebuild_vocabulary()
+    db.update_metadata()
+    db.close()
+
+def build_search_index(db):
+    """(Re)build the full-text index the search engine expects, over the current articles"""
+    db.conn.executescript('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS wikipedia_fts USING fts5(
+            title, content, summary, content='wikipedia_articles', content_rowid='id'
+        );
+        INSERT INTO wikipedia_fts (wikipedia_fts) VALUES ('rebuild');
+    ''')
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Test case with a scratch directory for the whole class. Subclasses that
+    define an articles() classmethod get a database built from it, at db_path.
+    """
+
+    articles = None
+    vocabulary = False
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.db_path = os.path.join(cls.tmp_dir, 'wikipedia.db')
+        if cls.articles is not None:
+            build_database(cls.db_path, cls.articles(), cls.vocabulary)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir)
@@ -0,0 +1,67 @@
+/**
+ * Unit tests for the Wikipedia bridge frame decoder
+ * Tests decoding of the binary framing written by `wikipedia_api.py --format binary`
+ */
+
+const zlib = require('zlib');
+const { FrameDecoder, decodeMessages } = require('../../core/wikipedia-frames.js');
+
+function frame(type, payload, compress = false) {
+    let data = Buffer.from(payload, 'utf8');
+    if (compress) {
+        data = zlib.deflateSync(data);
+    }
+    const header = Buffer.alloc(6);
+    header.write(type, 0, 'latin1');
+    header[1] = compress ? 0x01 : 0x00;
+    header.writeUInt32BE(data.length, 2);
+    return Buffer.concat([header, data]);
+}
+
+function message(document, bodies = [], compress = false) {
+    return Buffer.concat([
+        frame('J', JSON.stringify(document), compress),
+        ...bodies.map((body) => frame('B', body, compress)),
+        frame('E', ''),
+    ]);
+}
+
+describe('Wikipedia frame decoder', () => {
+    const content = 'Pół "quoted" text\n'.repeat(500);
+    const articleMessage = message(
+        { id: 1, result: { article: { title: 'Poland', content: { $body: 0 } } } },
+        [content]
+    );
+
+    test('restores body frames into the JSON document', () => {
+        const [response] = decodeMessages(articleMessage);
+
+        expect(response.id).toBe(1);
+        expect(response.result.article.title).toBe('Poland');
+        expect(response.result.article.content).toBe(content);
+    });
+
+    test('decodes compressed frames', () => {
+        const [response] = decodeMessages(message({ id: 2, result: { body: { $body: 0 } } }, [content], true));
+
+        expect(response.result.body).toBe(content);
+    });
+
+    test('decodes messages split across arbitrary chunks', () => {
+        const stream = Buffer.concat([articleMessage, message({ id: 2, result: {} })]);
+        const decoder = new FrameDecoder();
+        const responses = [];
+
+        for (let offset = 0; offset < stream.length; offset += 5) {
+            responses.push(...decoder.push(stream.subarray(offset, offset + 5)));
+        }
+
+        expect(responses.map((response) => response.id)).toEqual([1, 2]);
+        expect(responses[0].result.article.content).toBe(content);
+        expect(decoder.pending).toBe(false);
+    });
+
+    test('rejects truncated output', () => {
+        expect(() => decodeMessages(articleMessage.subarray(0, articleMessage.length - 3))).toThrow('Truncated');
+    });
+});